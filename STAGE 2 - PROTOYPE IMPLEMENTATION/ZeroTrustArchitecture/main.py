@@ -9,13 +9,15 @@ from typing import Dict, Any, Optional
 from fastapi import FastAPI, HTTPException, Depends, BackgroundTasks
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
+from sqlalchemy import func, case
 from sqlalchemy.orm import Session
 from loguru import logger
 
 from src.database import get_db, init_database
-from src.models import (
-    UserCreate, UserResponse, LoginRequest, Token, DeviceCreate, DeviceResponse, User, Device,
-    SecurityEventCreate, SecurityEventResponse
+from src.models import UserCreate, LoginRequest, DeviceCreate, User, Device, SecurityEventCreate
+from src.schemas_fast import (
+    UserResponse, DeviceResponse, Token, user_response, device_response, security_event_response
 )
 from src.identity.iam_service import IAMService, MicrosegmentationService, SecureAccessProxyService
 
@@ -62,6 +64,7 @@ async def lifespan(app: FastAPI):
 app = FastAPI(
     title="Zero Trust Architecture",
     version="1.0.0",
+    default_response_class=ORJSONResponse,
     lifespan=lifespan
 )
 
@@ -108,10 +111,12 @@ async def health_check():
 # ----------------------
 @app.post("/api/auth/register", response_model=UserResponse)
 async def register(user_data: UserCreate, db: Session = Depends(get_db)):
-    return iam_service.create_user(
+    user = iam_service.create_user(
         db, user_data.username, user_data.email, user_data.password,
         user_data.full_name, user_data.department, user_data.role
     )
+    # Returning a response directly skips output re-validation and jsonable_encoder
+    return ORJSONResponse(user_response(user))
 
 @app.post("/api/auth/login", response_model=Token)
 async def login(login_data: LoginRequest, db: Session = Depends(get_db)):
@@ -133,11 +138,11 @@ async def login(login_data: LoginRequest, db: Session = Depends(get_db)):
     token_data = {"sub": user.username, "session_id": session.session_id}
     access_token = iam_service.create_access_token(token_data)
 
-    return {
-        "access_token": access_token,
-        "token_type": "bearer",
-        "expires_in": iam_service.ACCESS_TOKEN_EXPIRE_MINUTES * 60
-    }
+    return Token(
+        access_token=access_token,
+        token_type="bearer",
+        expires_in=iam_service.ACCESS_TOKEN_EXPIRE_MINUTES * 60
+    )
 
 @app.post("/api/auth/logout")
 async def logout(current_user=Depends(verify_token), db: Session = Depends(get_db)):
@@ -178,7 +183,7 @@ async def register_device(device_data: DeviceCreate, db: Session = Depends(get_d
         existing_device.updated_at = datetime.utcnow()
         db.commit()
         db.refresh(existing_device)
-        return existing_device
+        return ORJSONResponse(device_response(existing_device))
     
     # Create new device
     device = Device(
@@ -192,12 +197,12 @@ async def register_device(device_data: DeviceCreate, db: Session = Depends(get_d
     db.add(device)
     db.commit()
     db.refresh(device)
-    return device
+    return ORJSONResponse(device_response(device))
 
 @app.get("/api/devices")
 async def list_devices(db: Session = Depends(get_db), current_user=Depends(verify_token)):
     devices = db.query(Device).all()
-    return [dict(
+    return ORJSONResponse([dict(
         device_id=d.device_id,
         device_name=d.device_name,
         device_type=d.device_type,
@@ -206,8 +211,8 @@ async def list_devices(db: Session = Depends(get_db), current_user=Depends(verif
         trust_score=d.trust_score,
         is_compliant=d.is_compliant,
         is_quarantined=d.is_quarantined,
-        last_seen=d.last_seen.isoformat() if d.last_seen else None
-    ) for d in devices]
+        last_seen=d.last_seen
+    ) for d in devices])
 
 # ----------------------
 # Microsegmentation Firewall
@@ -307,15 +312,7 @@ async def list_security_events(db: Session = Depends(get_db), current_user=Depen
     """List all security events"""
     from src.models import SecurityEvent
     events = db.query(SecurityEvent).order_by(SecurityEvent.created_at.desc()).limit(100).all()
-    return [{
-        "event_id": event.event_id,
-        "event_type": event.event_type,
-        "threat_level": event.threat_level,
-        "confidence_score": event.confidence_score,
-        "description": event.description,
-        "is_resolved": event.is_resolved,
-        "created_at": event.created_at.isoformat()
-    } for event in events]
+    return ORJSONResponse([security_event_response(event) for event in events])
 
 # ----------------------
 # Dashboard Endpoint
@@ -326,19 +323,23 @@ async def get_dashboard_data(db: Session = Depends(get_db)):
     from src.models import SecurityEvent
     from datetime import timedelta
 
-    # Get device statistics
-    total_devices = db.query(Device).count()
-    compliant_devices = db.query(Device).filter(Device.is_compliant == True).count()
-    quarantined_devices = db.query(Device).filter(Device.is_quarantined == True).count()
+    # Get device statistics in one aggregate query
+    total_devices, compliant_devices, quarantined_devices = db.query(
+        func.count(Device.id),
+        func.count(case((Device.is_compliant == True, 1))),
+        func.count(case((Device.is_quarantined == True, 1)))
+    ).one()
     online_devices = total_devices - quarantined_devices  # Simplified for demo
 
-    # Get security events from last 24 hours
+    # Get security events from last 24 hours, counted per threat level in the database
     yesterday = datetime.utcnow() - timedelta(hours=24)
-    security_events_24h = db.query(SecurityEvent).filter(SecurityEvent.created_at >= yesterday).count()
-    critical_events = db.query(SecurityEvent).filter(
-        SecurityEvent.threat_level == "critical",
+    threat_level_counts = dict(db.query(
+        SecurityEvent.threat_level, func.count(SecurityEvent.id)
+    ).filter(
         SecurityEvent.created_at >= yesterday
-    ).count()
+    ).group_by(SecurityEvent.threat_level).all())
+    security_events_24h = sum(threat_level_counts.values())
+    critical_events = threat_level_counts.get("critical", 0)
 
     # Calculate metrics
     compliance_rate = (compliant_devices / total_devices * 100) if total_devices > 0 else 0
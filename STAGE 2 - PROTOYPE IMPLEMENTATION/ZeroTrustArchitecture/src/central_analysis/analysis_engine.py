@@ -14,10 +14,9 @@ from sklearn.model_selection import train_test_split
 from sqlalchemy.orm import Session
 from loguru import logger
 import joblib
-import redis
 
 from ..models import SecurityEvent, Device, ThreatIntelligence, ThreatLevel, ResponseAction
-from ..database import db_manager
+from ..database import db_manager, get_redis_client
 
 
 class EventCorrelationEngine:
@@ -270,6 +269,7 @@ class ThreatIntelligenceService:
                 )
             
             db.commit()
+            self.load_active_iocs(db)
             logger.info(f"Updated {len(sample_iocs)} threat intelligence indicators")
             return True
             
@@ -278,16 +278,43 @@ class ThreatIntelligenceService:
             db.rollback()
             return False
     
+    def load_active_iocs(self, db: Session) -> int:
+        """Rebuild the Redis set of active indicators used to short-circuit IOC checks"""
+        members = [
+            f"{ioc_type}:{ioc_value}"
+            for ioc_type, ioc_value in db.query(
+                ThreatIntelligence.ioc_type, ThreatIntelligence.ioc_value
+            ).filter(ThreatIntelligence.is_active == True).all()
+        ]
+        
+        # Swap the set atomically so checks never see it half-built
+        pipe = self.redis_client.pipeline()
+        pipe.delete("ioc:active")
+        if members:
+            pipe.sadd("ioc:active", *members)
+        pipe.execute()
+        
+        logger.debug(f"Loaded {len(members)} active indicators into Redis")
+        return len(members)
+    
     def check_ioc(self, ioc_type: str, ioc_value: str) -> Optional[Dict[str, Any]]:
         """Check if an indicator is known threat"""
         try:
-            # First check Redis cache
+            # Check the Redis cache and the active indicator set in one round-trip
             cache_key = f"ioc:{ioc_type}:{ioc_value}"
-            cached_data = self.redis_client.get(cache_key)
+            pipe = self.redis_client.pipeline(transaction=False)
+            pipe.get(cache_key)
+            pipe.sismember("ioc:active", f"{ioc_type}:{ioc_value}")
+            pipe.exists("ioc:active")
+            cached_data, is_active_ioc, active_set_loaded = pipe.execute()
             
             if cached_data:
                 return json.loads(cached_data)
             
+            # Most candidates are benign; skip the database unless the set says otherwise
+            if active_set_loaded and not is_active_ioc:
+                return None
+            
             # Check database
             with db_manager.get_session() as db:
                 ioc = db.query(ThreatIntelligence).filter(
@@ -510,7 +537,7 @@ class CentralAnalysisEngine:
     """Main central analysis engine coordinating all analysis components"""
     
     def __init__(self, redis_host: str = "localhost", redis_port: int = 6379):
-        self.redis_client = redis.Redis(host=redis_host, port=redis_port, decode_responses=True)
+        self.redis_client = get_redis_client(redis_host, redis_port)
         
         # Initialize sub-components
         self.event_correlator = EventCorrelationEngine(self.redis_client)
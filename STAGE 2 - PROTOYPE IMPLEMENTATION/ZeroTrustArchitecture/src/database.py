@@ -4,10 +4,11 @@ Database configuration and setup for Zero Trust Architecture
 
 import os
 import yaml
-from sqlalchemy import create_engine
+import redis
+from sqlalchemy import create_engine, event, text
 from sqlalchemy.orm import sessionmaker
 from contextlib import contextmanager
-from typing import Generator
+from typing import Dict, Generator, Tuple
 from loguru import logger
 
 from .models import Base
@@ -29,6 +30,17 @@ class DatabaseManager:
             pool_recycle=3600
         )
         
+        if self.engine.dialect.name == "sqlite":
+            # pysqlite's own transaction handling breaks SAVEPOINT; let SQLAlchemy
+            # emit BEGIN itself so nested transactions work
+            @event.listens_for(self.engine, "connect")
+            def _disable_pysqlite_transactions(dbapi_connection, connection_record):
+                dbapi_connection.isolation_level = None
+            
+            @event.listens_for(self.engine, "begin")
+            def _begin_sqlite_transaction(conn):
+                conn.exec_driver_sql("BEGIN")
+        
         self.SessionLocal = sessionmaker(
             autocommit=False,
             autoflush=False,
@@ -40,6 +52,10 @@ class DatabaseManager:
     def create_tables(self):
         """Create all database tables"""
         Base.metadata.create_all(bind=self.engine)
+        
+        # Refresh planner statistics so new indexes are picked up
+        with self.engine.begin() as conn:
+            conn.execute(text("ANALYZE"))
         logger.info("Database tables created successfully")
     
     def drop_tables(self):
@@ -79,6 +95,38 @@ def get_db():
     yield from db_manager.get_db_session()
 
 
+# Redis connection pools shared by every service talking to the same server
+_redis_pools: Dict[Tuple[str, int], redis.ConnectionPool] = {}
+
+
+def get_redis_client(host: str = "localhost", port: int = 6379) -> redis.Redis:
+    """Get a Redis client backed by the process-wide connection pool for host:port"""
+    pool = _redis_pools.get((host, port))
+    if pool is None:
+        # Blocking pool waits for a free connection instead of failing when exhausted;
+        # health checks and keepalive catch connections dropped while idle
+        pool = _redis_pools.setdefault((host, port), redis.BlockingConnectionPool(
+            host=host,
+            port=port,
+            decode_responses=True,
+            max_connections=32,
+            timeout=5,
+            health_check_interval=30,
+            socket_keepalive=True
+        ))
+    return redis.Redis(connection_pool=pool)
+
+
+# Cached dashboard payload; services that change device state delete it. Bump the
+# version whenever the payload's shape changes
+DASHBOARD_CACHE_KEY = "dashboard:summary:v3"
+
+
+def device_details_version_key(device_id: str) -> str:
+    """Counter bumped on every posture or quarantine change, invalidating memoized device details"""
+    return f"devdetails:version:{device_id}"
+
+
 def init_database():
     """Initialize database with tables and sample data"""
     try:
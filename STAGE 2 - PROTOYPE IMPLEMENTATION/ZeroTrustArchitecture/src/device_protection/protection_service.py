@@ -15,10 +15,9 @@ from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
 import base64
 from sqlalchemy.orm import Session
 from loguru import logger
-import redis
 
 from ..models import Device, DevicePosture, User
-from ..database import db_manager
+from ..database import db_manager, get_redis_client
 
 
 class DevicePostureService:
@@ -837,7 +836,7 @@ class DeviceProtectionOrchestrator:
     """Main orchestrator for device and data protection services"""
     
     def __init__(self, redis_host: str = "localhost", redis_port: int = 6379):
-        self.redis_client = redis.Redis(host=redis_host, port=redis_port, decode_responses=True)
+        self.redis_client = get_redis_client(redis_host, redis_port)
         
         # Initialize services
         self.posture_service = DevicePostureService(self.redis_client)
@@ -5,23 +5,36 @@ Collects device telemetry and security information
 
 import os
 import sys
+import glob
 import json
 import time
+import orjson
 import psutil
 import socket
 import hashlib
 import platform
 import threading
 import requests
+from collections import deque
 from datetime import datetime, timedelta
 from typing import Dict, Any, List, Optional
-from dataclasses import dataclass, asdict
+from dataclasses import dataclass
 from loguru import logger
 
 
+# Local ports commonly used by backdoors and reverse shells
+UNUSUAL_LOCAL_PORTS = frozenset({4444, 31337, 12345})
+
+
 @dataclass
 class DeviceTelemetry:
     """Device telemetry data structure"""
+    __slots__ = (
+        "device_id", "timestamp", "cpu_usage", "memory_usage", "disk_usage",
+        "network_connections", "running_processes", "system_info",
+        "security_events", "compliance_status"
+    )
+    
     device_id: str
     timestamp: str
     cpu_usage: float
@@ -37,6 +50,11 @@ class DeviceTelemetry:
 @dataclass
 class NetworkConnection:
     """Network connection information"""
+    __slots__ = (
+        "local_address", "local_port", "remote_address", "remote_port",
+        "status", "pid", "process_name"
+    )
+    
     local_address: str
     local_port: int
     remote_address: str
@@ -49,6 +67,11 @@ class NetworkConnection:
 @dataclass
 class Process:
     """Process information"""
+    __slots__ = (
+        "pid", "name", "username", "cpu_percent", "memory_percent",
+        "cmdline", "create_time"
+    )
+    
     pid: int
     name: str
     username: str
@@ -64,7 +87,18 @@ class EndpointAgent:
         self.server_url = server_url
         self.running = False
         self.collection_interval = 60  # seconds
-        self.heartbeat_interval = 30  # seconds
+        self.heartbeat_interval = 30  # seconds; minimum silence before a fallback heartbeat
+        self._last_seen = 0.0  # monotonic time of last successful telemetry/heartbeat
+        
+        # Telemetry spooling: collector -> ring buffer -> ndjson files -> uploader
+        self.spool_dir = "logs"
+        self.flush_interval = 5  # seconds
+        self.upload_interval = 10  # seconds
+        self.flush_batch_size = 64
+        self._ring = deque(maxlen=1024)
+        self._ring_evictions = 0  # Oldest records dropped because the ring was full
+        self._ring_lock = threading.Lock()
+        self._flush_event = threading.Event()
         
         # Threat detection patterns
         self.suspicious_processes = [
@@ -217,7 +251,7 @@ class EndpointAgent:
         
         # Check for unusual network listening ports
         listening_ports = [conn['local_port'] for conn in connections if conn['status'] == 'LISTEN']
-        unusual_ports = [port for port in listening_ports if port > 10000 or port in [4444, 31337, 12345]]
+        unusual_ports = [port for port in listening_ports if port > 10000 or port in UNUSUAL_LOCAL_PORTS]
         
         for port in unusual_ports:
             events.append({
@@ -301,14 +335,19 @@ class EndpointAgent:
     
     def send_telemetry(self, telemetry: DeviceTelemetry) -> bool:
         """Send telemetry to the central server"""
+        return self._post_telemetry(orjson.dumps(telemetry))
+    
+    def _post_telemetry(self, body: bytes) -> bool:
+        """POST a pre-serialized telemetry record to the central server"""
         try:
             url = f"{self.server_url}/api/telemetry"
             headers = {"Content-Type": "application/json"}
-            data = asdict(telemetry)
             
-            response = requests.post(url, json=data, headers=headers, timeout=30)
+            response = requests.post(url, data=body, headers=headers, timeout=30)
             
             if response.status_code == 200:
+                # Telemetry arrival doubles as a heartbeat on the server side
+                self._last_seen = time.monotonic()
                 logger.debug(f"Telemetry sent successfully for device {self.device_id}")
                 return True
             else:
@@ -319,6 +358,104 @@ class EndpointAgent:
             logger.error(f"Error sending telemetry: {e}")
             return False
     
+    def enqueue_telemetry(self, telemetry: DeviceTelemetry) -> None:
+        """Buffer telemetry in memory; the flusher thread writes it to disk"""
+        with self._ring_lock:
+            evicted = len(self._ring) == self._ring.maxlen
+            if evicted:
+                self._ring_evictions += 1
+                evictions = self._ring_evictions
+            self._ring.append(telemetry)
+            full = len(self._ring) >= self.flush_batch_size
+        
+        if evicted:
+            # The flusher is falling behind (e.g. the spool can't be written);
+            # the deque silently drops the oldest record, so make it visible
+            logger.warning(f"Telemetry ring full, dropped oldest record ({evictions} dropped so far)")
+        if full:
+            self._flush_event.set()
+    
+    def _flush_ring(self) -> int:
+        """Drain the ring buffer into spool files, one write per batch"""
+        flushed = 0
+        while True:
+            with self._ring_lock:
+                batch = [self._ring.popleft() for _ in range(min(self.flush_batch_size, len(self._ring)))]
+            
+            if not batch:
+                return flushed
+            
+            data = b"".join(orjson.dumps(telemetry) + b"\n" for telemetry in batch)
+            path = os.path.join(self.spool_dir, f"telemetry-{self.device_id}-{time.time_ns()}.ndjson")
+            
+            # Write under a temporary name so the uploader never sees a partial file
+            with open(path + ".tmp", "wb") as f:
+                f.write(data)
+            os.replace(path + ".tmp", path)
+            flushed += len(batch)
+    
+    def _flusher_loop(self):
+        """Flush buffered telemetry to disk when the ring fills or periodically"""
+        os.makedirs(self.spool_dir, exist_ok=True)
+        while self.running:
+            try:
+                self._flush_event.wait(self.flush_interval)
+                self._flush_event.clear()
+                self._flush_ring()
+            except Exception as e:
+                logger.error(f"Error flushing telemetry: {e}")
+                time.sleep(5)
+        
+        # Persist whatever is left so it is uploaded on the next start
+        try:
+            self._flush_ring()
+        except Exception as e:
+            logger.error(f"Error flushing telemetry on shutdown: {e}")
+    
+    def _upload_spool_file(self, path: str) -> bool:
+        """Upload a spool file, keeping any records that failed to send"""
+        with open(path, "rb") as f:
+            records = f.read().splitlines()
+        
+        for index, record in enumerate(records):
+            if record and not self._post_telemetry(record):
+                # Keep unsent records for the next attempt
+                with open(path + ".tmp", "wb") as f:
+                    f.write(b"\n".join(records[index:]) + b"\n")
+                os.replace(path + ".tmp", path)
+                return False
+        
+        os.remove(path)
+        return True
+    
+    def _uploader_loop(self):
+        """Drain completed spool files to the central server"""
+        pattern = os.path.join(self.spool_dir, f"telemetry-{self.device_id}-*.ndjson")
+        while self.running:
+            try:
+                for path in sorted(glob.glob(pattern)):
+                    if not self._upload_spool_file(path):
+                        break  # Server unavailable, retry later
+                
+                # Only fall back to an explicit heartbeat when telemetry has not
+                # reached the server recently
+                if time.monotonic() - self._last_seen > self._heartbeat_threshold():
+                    self.send_heartbeat()
+                
+                time.sleep(self.upload_interval)
+            except Exception as e:
+                logger.error(f"Error uploading telemetry: {e}")
+                time.sleep(self.upload_interval)
+    
+    def _heartbeat_threshold(self) -> float:
+        """Seconds without delivered telemetry before an explicit heartbeat is due"""
+        # A record can wait one collection interval to be produced, then up to a
+        # flush and an upload interval to reach the server
+        return max(
+            self.heartbeat_interval,
+            self.collection_interval + self.flush_interval + self.upload_interval
+        )
+    
     def send_heartbeat(self) -> bool:
         """Send heartbeat to server"""
         try:
@@ -330,7 +467,10 @@ class EndpointAgent:
             }
             
             response = requests.post(url, json=data, timeout=10)
-            return response.status_code == 200
+            if response.status_code == 200:
+                self._last_seen = time.monotonic()
+                return True
+            return False
             
         except Exception as e:
             logger.error(f"Error sending heartbeat: {e}")
@@ -341,16 +481,17 @@ class EndpointAgent:
         self.running = True
         logger.info(f"Starting endpoint monitoring for device {self.device_id}")
         
-        # Start heartbeat thread
-        heartbeat_thread = threading.Thread(target=self._heartbeat_loop)
-        heartbeat_thread.daemon = True
-        heartbeat_thread.start()
+        # Start spool threads; collection never blocks on the network
+        for target in (self._flusher_loop, self._uploader_loop):
+            thread = threading.Thread(target=target)
+            thread.daemon = True
+            thread.start()
         
         # Main monitoring loop
         while self.running:
             try:
                 telemetry = self.collect_telemetry()
-                self.send_telemetry(telemetry)
+                self.enqueue_telemetry(telemetry)
                 
                 time.sleep(self.collection_interval)
                 
@@ -362,19 +503,10 @@ class EndpointAgent:
                 logger.error(f"Error in monitoring loop: {e}")
                 time.sleep(10)  # Wait before retrying
     
-    def _heartbeat_loop(self):
-        """Heartbeat loop running in separate thread"""
-        while self.running:
-            try:
-                self.send_heartbeat()
-                time.sleep(self.heartbeat_interval)
-            except Exception as e:
-                logger.error(f"Error in heartbeat loop: {e}")
-                time.sleep(5)
-    
     def stop_monitoring(self):
         """Stop the monitoring"""
         self.running = False
+        self._flush_event.set()
         logger.info(f"Stopped endpoint monitoring for device {self.device_id}")
 
 
@@ -3,28 +3,46 @@ Endpoint Monitoring Service for Zero Trust Architecture
 Collects and processes telemetry from endpoint agents
 """
 
-import json
+import time
+import random
 import asyncio
+import msgpack
+import orjson
 import redis
+import redis.asyncio as aioredis
 from datetime import datetime, timedelta
 from typing import Dict, Any, List, Optional
+from sqlalchemy import func, case
 from sqlalchemy.orm import Session
 from loguru import logger
 
 from ..models import Device, SecurityEvent, DevicePosture, ThreatLevel
-from ..database import db_manager
+from ..database import DASHBOARD_CACHE_KEY, db_manager, device_details_version_key, get_redis_client
+
+
+# Remote ports commonly used by backdoors and reverse shells
+UNUSUAL_REMOTE_PORTS = frozenset({4444, 31337, 12345})
 
 
 class EndpointMonitoringService:
     def __init__(self, redis_host: str = "localhost", redis_port: int = 6379):
-        self.redis_client = redis.Redis(host=redis_host, port=redis_port, decode_responses=True)
+        self.redis_host = redis_host
+        self.redis_port = redis_port
+        self.redis_client = get_redis_client(redis_host, redis_port)
         self.device_cache = {}  # In-memory cache for device states
         self.telemetry_buffer = {}  # Buffer for batch processing
+        self._buffered_count = 0
+        self._drain_event = None  # Created on the monitoring loop in start_monitoring
+        self._stop = None  # Shutdown signal shared by the background loops
         
         # Configuration
         self.HEARTBEAT_TIMEOUT = 300  # 5 minutes
         self.TELEMETRY_BATCH_SIZE = 100
+        self.TELEMETRY_MAX_BUFFER_AGE = 60  # seconds
+        self.TELEMETRY_TTL = 3600  # 1 hour
+        self.DEVICE_STATUS_TTL = 3  # seconds; dashboards poll status far more often than it changes
         self.COMPLIANCE_THRESHOLD = 0.8
+        self.MAX_RETRY_DELAY = 900  # Cap for background loop back-off, seconds
         
         logger.info("Endpoint Monitoring Service initialized")
     
@@ -41,14 +59,7 @@ class EndpointMonitoringService:
             
             if not device:
                 # Create new device
-                device = Device(
-                    device_id=device_id,
-                    device_name=device_data.get("device_name", f"Device {device_id}"),
-                    device_type=device_data.get("device_type", "unknown"),
-                    mac_address=device_data.get("mac_address", ""),
-                    ip_address=device_data.get("ip_address"),
-                    os_version=device_data.get("os_version")
-                )
+                device = self._new_device(device_data)
                 db.add(device)
                 logger.info(f"Registered new device: {device_id}")
             else:
@@ -67,8 +78,21 @@ class EndpointMonitoringService:
             db.rollback()
             return False
     
-    def process_heartbeat(self, heartbeat_data: Dict[str, Any]) -> bool:
-        """Process device heartbeat"""
+    @staticmethod
+    def _new_device(device_data: Dict[str, Any]) -> Device:
+        """Build a Device row for a device registering for the first time"""
+        device_id = device_data["device_id"]
+        return Device(
+            device_id=device_id,
+            device_name=device_data.get("device_name", f"Device {device_id}"),
+            device_type=device_data.get("device_type", "unknown"),
+            mac_address=device_data.get("mac_address", ""),
+            ip_address=device_data.get("ip_address"),
+            os_version=device_data.get("os_version")
+        )
+    
+    def process_heartbeat(self, heartbeat_data: Dict[str, Any], pipe=None) -> bool:
+        """Process device heartbeat, optionally queueing the write on a Redis pipeline"""
         try:
             device_id = heartbeat_data.get("device_id")
             timestamp = heartbeat_data.get("timestamp")
@@ -79,14 +103,18 @@ class EndpointMonitoringService:
             
             # Store in Redis for quick access
             heartbeat_key = f"heartbeat:{device_id}"
-            self.redis_client.setex(
+            client = pipe if pipe is not None else self.redis_client
+            client.setex(
                 heartbeat_key,
                 self.HEARTBEAT_TIMEOUT,
-                json.dumps({
+                orjson.dumps({
                     "timestamp": timestamp,
                     "status": status
                 })
             )
+            # Online set scored by last heartbeat, so it can be counted without
+            # touching every device's heartbeat key
+            client.zadd("online_devices", {device_id: time.time()})
             
             # Update device cache
             self.device_cache[device_id] = {
@@ -102,6 +130,19 @@ class EndpointMonitoringService:
             logger.error(f"Error processing heartbeat: {e}")
             return False
     
+    def buffer_telemetry(self, telemetry_data: Dict[str, Any]) -> bool:
+        """Queue telemetry for batch processing, waking the drain task when a batch is full"""
+        device_id = telemetry_data.get("device_id")
+        if not device_id:
+            logger.error("Device ID is required for telemetry")
+            return False
+        
+        self.telemetry_buffer.setdefault(device_id, []).append(telemetry_data)
+        self._buffered_count += 1
+        if self._buffered_count >= self.TELEMETRY_BATCH_SIZE and self._drain_event is not None:
+            self._drain_event.set()
+        return True
+    
     def process_telemetry(self, db: Session, telemetry_data: Dict[str, Any]) -> bool:
         """Process device telemetry data"""
         try:
@@ -122,33 +163,9 @@ class EndpointMonitoringService:
                 })
                 device = db.query(Device).filter(Device.device_id == device_id).first()
             
-            # Update device last seen
-            device.last_seen = datetime.utcnow()
-            
-            # Process security events
-            security_events = telemetry_data.get("security_events", [])
-            for event_data in security_events:
-                self._create_security_event(db, device, event_data)
-            
-            # Update device posture
-            compliance_status = telemetry_data.get("compliance_status", {})
-            self._update_device_posture(db, device, compliance_status)
-            
-            # Calculate trust score
-            trust_score = self._calculate_trust_score(telemetry_data, compliance_status)
-            device.trust_score = trust_score
-            
-            # Store detailed telemetry in Redis for analysis
-            telemetry_key = f"telemetry:{device_id}:{datetime.utcnow().timestamp()}"
-            self.redis_client.setex(
-                telemetry_key,
-                3600,  # 1 hour TTL
-                json.dumps(telemetry_data)
-            )
-            
-            # Update device compliance status
-            compliance_score = sum(compliance_status.values()) / len(compliance_status) if compliance_status else 0
-            device.is_compliant = compliance_score >= self.COMPLIANCE_THRESHOLD
+            pipe = self.redis_client.pipeline(transaction=False)
+            self._apply_telemetry(db, device, telemetry_data, pipe)
+            pipe.execute()
             
             db.commit()
             logger.debug(f"Processed telemetry from device {device_id}")
@@ -159,6 +176,55 @@ class EndpointMonitoringService:
             db.rollback()
             return False
     
+    def _apply_telemetry(self, db: Session, device: Device, telemetry_data: Dict[str, Any],
+                         pipe, posture: Optional[DevicePosture] = None) -> None:
+        """Apply one telemetry record to a device, queueing Redis writes on pipe"""
+        # Update device last seen
+        device.last_seen = datetime.utcnow()
+        
+        # Process security events
+        security_events = telemetry_data.get("security_events", [])
+        for event_data in security_events:
+            self._create_security_event(db, device, event_data)
+        
+        # Update device posture
+        compliance_status = telemetry_data.get("compliance_status", {})
+        self._update_device_posture(db, device, compliance_status, posture)
+        
+        # Calculate trust score
+        trust_score = self._calculate_trust_score(telemetry_data, compliance_status)
+        device.trust_score = trust_score
+        
+        # Update device compliance status
+        compliance_score = sum(compliance_status.values()) / len(compliance_status) if compliance_status else 0
+        device.is_compliant = compliance_score >= self.COMPLIANCE_THRESHOLD
+        
+        # Surface any SQL or encoding error before a Redis write is queued, so a
+        # rejected record leaves nothing behind on the shared pipeline
+        db.flush()
+        packed_telemetry = msgpack.packb(telemetry_data, use_bin_type=True)
+        
+        # Queue detailed telemetry for Redis. Telemetry, heartbeat and device
+        # state share the caller's pipeline; telemetry is MsgPack-encoded
+        # (read back with msgpack.unpackb(..., raw=False))
+        timestamp = datetime.utcnow().timestamp()
+        telemetry_key = f"telemetry:{device.device_id}:{timestamp}"
+        pipe.setex(telemetry_key, self.TELEMETRY_TTL, packed_telemetry)
+        pipe.zadd("telemetry:index", {telemetry_key: timestamp})
+
+        # Telemetry arrival counts as a heartbeat; agents only send explicit
+        # heartbeats when telemetry has stalled
+        self.process_heartbeat({
+            "device_id": device.device_id,
+            "timestamp": telemetry_data.get("timestamp"),
+            "status": "online"
+        }, pipe=pipe)
+        pipe.hset(f"device:{device.device_id}", mapping={
+            "last_seen": timestamp,
+            "trust_score": trust_score
+        })
+        pipe.incr(device_details_version_key(device.device_id))  # Posture and trust score changed
+    
     def _create_security_event(self, db: Session, device: Device, event_data: Dict[str, Any]) -> None:
         """Create a security event"""
         try:
@@ -206,11 +272,13 @@ class EndpointMonitoringService:
         except Exception as e:
             logger.error(f"Error creating security event: {e}")
     
-    def _update_device_posture(self, db: Session, device: Device, compliance_status: Dict[str, bool]) -> None:
+    def _update_device_posture(self, db: Session, device: Device, compliance_status: Dict[str, bool],
+                               posture: Optional[DevicePosture] = None) -> None:
         """Update device posture information"""
         try:
             # Find existing posture record or create new one
-            posture = db.query(DevicePosture).filter(DevicePosture.device_id == device.id).first()
+            if posture is None:
+                posture = db.query(DevicePosture).filter(DevicePosture.device_id == device.id).first()
             
             if not posture:
                 posture = DevicePosture(device_id=device.id)
@@ -266,7 +334,7 @@ class EndpointMonitoringService:
             
             # Factor 4: Network activity (10% weight)
             connections = telemetry_data.get("network_connections", [])
-            unusual_connections = sum(1 for conn in connections if conn.get("remote_port", 0) in [4444, 31337, 12345])
+            unusual_connections = sum(1 for conn in connections if conn.get("remote_port", 0) in UNUSUAL_REMOTE_PORTS)
             if unusual_connections > 0:
                 base_score -= unusual_connections * 0.05
             
@@ -278,8 +346,13 @@ class EndpointMonitoringService:
             return 0.5  # Return neutral score on error
     
     def get_device_status(self, device_id: str) -> Dict[str, Any]:
-        """Get current device status"""
+        """Get current device status, served from a short-lived Redis cache when possible"""
+        status_key = f"devstatus:{device_id}"
         try:
+            cached = self.redis_client.get(status_key)
+            if cached:
+                return orjson.loads(cached)
+            
             # Check heartbeat
             heartbeat_key = f"heartbeat:{device_id}"
             heartbeat_data = self.redis_client.get(heartbeat_key)
@@ -288,20 +361,30 @@ class EndpointMonitoringService:
             last_seen = None
             
             if heartbeat_data:
-                heartbeat_info = json.loads(heartbeat_data)
+                heartbeat_info = orjson.loads(heartbeat_data)
                 last_seen = heartbeat_info.get("timestamp")
                 online = True
             
-            # Get device info from cache or database
+            # Get device info and latest posture in a single query
             with db_manager.get_session() as db:
-                device = db.query(Device).filter(Device.device_id == device_id).first()
+                device = db.query(
+                    Device.device_name,
+                    Device.device_type,
+                    Device.last_seen,
+                    Device.trust_score,
+                    Device.is_compliant,
+                    Device.is_quarantined,
+                    Device.ip_address,
+                    Device.mac_address,
+                    DevicePosture.compliance_score
+                ).outerjoin(
+                    DevicePosture, DevicePosture.device_id == Device.id
+                ).filter(Device.device_id == device_id).first()
+                
                 if not device:
                     return {"error": "Device not found"}
                 
-                # Get latest posture
-                posture = db.query(DevicePosture).filter(DevicePosture.device_id == device.id).first()
-                
-                return {
+                status = {
                     "device_id": device_id,
                     "device_name": device.device_name,
                     "device_type": device.device_type,
@@ -310,11 +393,14 @@ class EndpointMonitoringService:
                     "trust_score": device.trust_score,
                     "is_compliant": device.is_compliant,
                     "is_quarantined": device.is_quarantined,
-                    "compliance_score": posture.compliance_score if posture else 0.0,
+                    "compliance_score": device.compliance_score or 0.0,
                     "ip_address": device.ip_address,
                     "mac_address": device.mac_address
                 }
             
+            self.redis_client.setex(status_key, self.DEVICE_STATUS_TTL, orjson.dumps(status))
+            return status
+            
         except Exception as e:
             logger.error(f"Error getting device status: {e}")
             return {"error": str(e)}
@@ -322,18 +408,19 @@ class EndpointMonitoringService:
     def get_offline_devices(self) -> List[str]:
         """Get list of offline devices"""
         try:
-            offline_devices = []
-            
             with db_manager.get_session() as db:
-                # Get all devices
-                devices = db.query(Device).all()
-                
-                for device in devices:
-                    heartbeat_key = f"heartbeat:{device.device_id}"
-                    if not self.redis_client.exists(heartbeat_key):
-                        offline_devices.append(device.device_id)
+                # Only the identifiers are needed
+                device_ids = [row[0] for row in db.query(Device.device_id).all()]
             
-            return offline_devices
+            if not device_ids:
+                return []
+            
+            # Devices are online when they heartbeat inside the timeout window
+            online = set(self.redis_client.zrangebyscore(
+                "online_devices", time.time() - self.HEARTBEAT_TIMEOUT, "+inf"
+            ))
+            
+            return [device_id for device_id in device_ids if device_id not in online]
             
         except Exception as e:
             logger.error(f"Error getting offline devices: {e}")
@@ -343,31 +430,30 @@ class EndpointMonitoringService:
         """Get security summary across all devices"""
         try:
             with db_manager.get_session() as db:
-                # Count devices by status
-                total_devices = db.query(Device).count()
-                compliant_devices = db.query(Device).filter(Device.is_compliant == True).count()
-                quarantined_devices = db.query(Device).filter(Device.is_quarantined == True).count()
+                # Device counts and average trust score in one aggregate query
+                total_devices, compliant_devices, quarantined_devices, avg_trust_score = db.query(
+                    func.count(Device.id),
+                    func.count(case((Device.is_compliant == True, 1))),
+                    func.count(case((Device.is_quarantined == True, 1))),
+                    func.avg(case((Device.trust_score > 0, Device.trust_score)))
+                ).one()
+                avg_trust_score = avg_trust_score or 0
                 
-                # Count recent security events
+                # Recent and unresolved critical event counts in one aggregate query
                 recent_threshold = datetime.utcnow() - timedelta(hours=24)
-                recent_events = db.query(SecurityEvent).filter(
-                    SecurityEvent.created_at >= recent_threshold
-                ).count()
-                
-                # Count critical events
-                critical_events = db.query(SecurityEvent).filter(
-                    SecurityEvent.threat_level == ThreatLevel.CRITICAL,
-                    SecurityEvent.is_resolved == False
-                ).count()
-                
-                # Average trust score
-                devices_with_scores = db.query(Device).filter(Device.trust_score > 0).all()
-                avg_trust_score = 0
-                if devices_with_scores:
-                    avg_trust_score = sum(d.trust_score for d in devices_with_scores) / len(devices_with_scores)
+                recent_events, critical_events = db.query(
+                    func.count(case((SecurityEvent.created_at >= recent_threshold, 1))),
+                    func.count(case((
+                        (SecurityEvent.threat_level == ThreatLevel.CRITICAL) &
+                        (SecurityEvent.is_resolved == False), 1
+                    )))
+                ).one()
                 
-                # Get offline devices
-                offline_count = len(self.get_offline_devices())
+                # Count devices with a heartbeat inside the timeout window
+                online_count = self.redis_client.zcount(
+                    "online_devices", time.time() - self.HEARTBEAT_TIMEOUT, "+inf"
+                )
+                offline_count = max(total_devices - online_count, 0)
                 
                 return {
                     "total_devices": total_devices,
@@ -402,11 +488,13 @@ class EndpointMonitoringService:
             self.redis_client.setex(
                 quarantine_key,
                 86400,  # 24 hours
-                json.dumps({
+                orjson.dumps({
                     "reason": reason,
-                    "timestamp": datetime.utcnow().isoformat()
-                })
+                    "timestamp": datetime.utcnow()
+                }, option=orjson.OPT_NAIVE_UTC | orjson.OPT_UTC_Z)
             )
+            self.redis_client.delete(f"devstatus:{device_id}", DASHBOARD_CACHE_KEY)
+            self.redis_client.incr(device_details_version_key(device_id))
             
             logger.info(f"Device {device_id} quarantined: {reason}")
             return True
@@ -427,9 +515,10 @@ class EndpointMonitoringService:
             device.is_quarantined = False
             db.commit()
             
-            # Remove quarantine record
+            # Remove quarantine record and the cached status and dashboard
             quarantine_key = f"quarantine:{device_id}"
-            self.redis_client.delete(quarantine_key)
+            self.redis_client.delete(quarantine_key, f"devstatus:{device_id}", DASHBOARD_CACHE_KEY)
+            self.redis_client.incr(device_details_version_key(device_id))
             
             logger.info(f"Device {device_id} released from quarantine")
             return True
@@ -440,72 +529,227 @@ class EndpointMonitoringService:
             return False
     
     async def start_monitoring(self):
-        """Start the monitoring service"""
+        """Start the monitoring service and run until stop_monitoring is called"""
         logger.info("Starting endpoint monitoring service...")
+        self._drain_event = asyncio.Event()
+        self._stop = asyncio.Event()
         
-        # Start background tasks
+        # Start background tasks; each loop handles its own errors, and
+        # return_exceptions keeps one unexpected failure from orphaning the rest
         tasks = [
             asyncio.create_task(self._cleanup_old_data()),
             asyncio.create_task(self._monitor_device_health()),
             asyncio.create_task(self._process_telemetry_buffer())
         ]
         
-        await asyncio.gather(*tasks)
+        for task, result in zip(tasks, await asyncio.gather(*tasks, return_exceptions=True)):
+            if isinstance(result, Exception):
+                logger.error(f"Monitoring task {task.get_coro().__name__} exited with error: {result}")
+        
+        logger.info("Endpoint monitoring service stopped")
+    
+    def stop_monitoring(self) -> None:
+        """Signal the background loops to exit after their current iteration"""
+        if self._stop is not None:
+            self._stop.set()
+        if self._drain_event is not None:
+            self._drain_event.set()
+    
+    def _retry_delay(self, base: float, failures: int) -> float:
+        """Exponential back-off with jitter so replicas don't retry in lockstep"""
+        delay = min(base * 2 ** max(failures - 1, 0), self.MAX_RETRY_DELAY)
+        return delay * (1 + random.random() * 0.25)
+    
+    async def _wait_or_stop(self, delay: float) -> bool:
+        """Sleep for up to delay seconds, returning True if shutdown was requested"""
+        try:
+            await asyncio.wait_for(self._stop.wait(), timeout=delay)
+            return True
+        except asyncio.TimeoutError:
+            return False
     
     async def _cleanup_old_data(self):
         """Clean up old telemetry and heartbeat data"""
-        while True:
+        failures = 0
+        while not self._stop.is_set():
             try:
-                # Clean up old Redis keys
-                pattern = "telemetry:*"
-                keys = self.redis_client.keys(pattern)
+                # Telemetry keys are indexed by write time, so expired entries
+                # are found with a range query instead of scanning the keyspace
+                cutoff = datetime.utcnow().timestamp() - self.TELEMETRY_TTL
+                expired = self.redis_client.zrangebyscore("telemetry:index", 0, cutoff)
                 
-                current_time = datetime.utcnow().timestamp()
-                for key in keys:
-                    # Extract timestamp from key
-                    try:
-                        timestamp = float(key.split(":")[-1])
-                        if current_time - timestamp > 86400:  # 24 hours
-                            self.redis_client.delete(key)
-                    except (ValueError, IndexError):
-                        pass
+                deleted = 0
+                for i in range(0, len(expired), 256):
+                    deleted += self.redis_client.delete(*expired[i:i + 256])
+                self.redis_client.zremrangebyscore("telemetry:index", 0, cutoff)
+                self.redis_client.zremrangebyscore(
+                    "online_devices", 0, time.time() - self.HEARTBEAT_TIMEOUT
+                )
                 
-                logger.debug(f"Cleaned up {len(keys)} old telemetry keys")
-                await asyncio.sleep(3600)  # Run every hour
+                logger.debug(f"Cleaned up {len(expired)} indexed telemetry keys ({deleted} still present)")
+                failures = 0
+                delay = self._retry_delay(3600, 0)  # Run every hour
                 
             except Exception as e:
+                failures += 1
                 logger.error(f"Error in cleanup task: {e}")
-                await asyncio.sleep(300)  # Wait 5 minutes on error
+                delay = self._retry_delay(300, failures)
+            
+            await self._wait_or_stop(delay)
     
     async def _monitor_device_health(self):
-        """Monitor device health and mark offline devices"""
-        while True:
+        """Mark devices offline as soon as their heartbeat key expires"""
+        try:
+            self._enable_expiry_notifications()
+        except redis.RedisError as e:
+            logger.warning(f"Redis keyspace notifications unavailable, polling device health instead: {e}")
+            await self._poll_device_health()
+            return
+        
+        failures = 0
+        while not self._stop.is_set():
+            client = aioredis.Redis(host=self.redis_host, port=self.redis_port, decode_responses=True)
+            pubsub = client.pubsub()
+            try:
+                await pubsub.psubscribe("__keyevent@*__:expired")
+                failures = 0
+                # Poll with a timeout so a shutdown request is noticed promptly
+                while not self._stop.is_set():
+                    message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+                    if message and message["data"].startswith("heartbeat:"):
+                        self._mark_device_offline(message["data"].split(":", 1)[1])
+                
+            except Exception as e:
+                failures += 1
+                logger.error(f"Error in device health monitoring: {e}")
+            finally:
+                await pubsub.close()
+                await client.close()
+            
+            if failures:
+                await self._wait_or_stop(self._retry_delay(60, failures))
+    
+    def _enable_expiry_notifications(self) -> None:
+        """Ensure Redis publishes expired-key events, keeping any flags already set"""
+        flags = self.redis_client.config_get("notify-keyspace-events").get("notify-keyspace-events", "")
+        if "E" in flags and ("x" in flags or "A" in flags):
+            return
+        
+        missing = "".join(flag for flag in "Ex" if flag not in flags)
+        self.redis_client.config_set("notify-keyspace-events", flags + missing)
+    
+    def _mark_device_offline(self, device_id: str) -> None:
+        """Record a device whose heartbeat has lapsed"""
+        cached = self.device_cache.setdefault(device_id, {})
+        cached["online"] = False
+        cached["status"] = "offline"
+        self.redis_client.zrem("online_devices", device_id)
+        logger.warning(f"Device {device_id} went offline (heartbeat expired)")
+    
+    async def _poll_device_health(self):
+        """Fallback for Redis servers that don't allow enabling keyspace notifications"""
+        failures = 0
+        while not self._stop.is_set():
             try:
                 offline_devices = self.get_offline_devices()
                 if offline_devices:
                     logger.warning(f"Found {len(offline_devices)} offline devices: {offline_devices}")
                 
-                await asyncio.sleep(300)  # Check every 5 minutes
+                failures = 0
+                delay = self._retry_delay(300, 0)  # Check every 5 minutes
                 
             except Exception as e:
+                failures += 1
                 logger.error(f"Error in device health monitoring: {e}")
-                await asyncio.sleep(60)
+                delay = self._retry_delay(60, failures)
+            
+            await self._wait_or_stop(delay)
+    
+    def _drain_telemetry(self, buffer: Dict[str, List[Dict[str, Any]]]) -> None:
+        """Apply buffered telemetry with one device lookup and one commit per drain;
+        each record runs in its own savepoint so a bad one is skipped, not the batch"""
+        with db_manager.get_session() as db:
+            # Resolve all devices and postures up front instead of per record
+            devices = {
+                device.device_id: device
+                for device in db.query(Device).filter(Device.device_id.in_(list(buffer))).all()
+            }
+            postures = {
+                posture.device_id: posture
+                for posture in db.query(DevicePosture).filter(
+                    DevicePosture.device_id.in_([device.id for device in devices.values()])
+                ).all()
+            } if devices else {}
+            
+            pipe = self.redis_client.pipeline(transaction=False)
+            for device_id, telemetry_list in buffer.items():
+                for telemetry in telemetry_list:
+                    device = devices.get(device_id)
+                    posture = postures.get(device.id) if device is not None else None
+                    try:
+                        with db.begin_nested():
+                            if device is None:
+                                # Unknown device, registered in the same savepoint
+                                logger.warning("Unknown device sending telemetry: {}", device_id)
+                                device = self._new_device({
+                                    "device_id": device_id,
+                                    "device_name": f"Auto-registered {device_id}",
+                                    "device_type": "unknown"
+                                })
+                                db.add(device)
+                                db.flush()
+                            if posture is None:
+                                posture = DevicePosture(device_id=device.id)
+                                db.add(posture)
+                            
+                            self._apply_telemetry(db, device, telemetry, pipe, posture)
+                    except Exception as e:
+                        logger.error("Skipping telemetry record from device {}: {}", device_id, e)
+                        continue
+                    
+                    # Only rows that survived their savepoint are reused by later records
+                    devices[device_id] = device
+                    postures[device.id] = posture
+            
+            pipe.execute()
+            db.commit()
+    
+    def _requeue_telemetry(self, buffer: Dict[str, List[Dict[str, Any]]]) -> None:
+        """Put a failed drain's telemetry back ahead of anything buffered since"""
+        for device_id, telemetry_list in buffer.items():
+            self.telemetry_buffer[device_id] = telemetry_list + self.telemetry_buffer.get(device_id, [])
+            self._buffered_count += len(telemetry_list)
     
     async def _process_telemetry_buffer(self):
-        """Process buffered telemetry data"""
+        """Process buffered telemetry when a batch fills or the buffer gets too old"""
+        failures = 0
         while True:
             try:
+                try:
+                    await asyncio.wait_for(self._drain_event.wait(), timeout=self.TELEMETRY_MAX_BUFFER_AGE)
+                except asyncio.TimeoutError:
+                    pass
+                self._drain_event.clear()
+                
                 if self.telemetry_buffer:
-                    with db_manager.get_session() as db:
-                        for device_id, telemetry_list in self.telemetry_buffer.items():
-                            for telemetry in telemetry_list:
-                                self.process_telemetry(db, telemetry)
-                    
-                    self.telemetry_buffer.clear()
+                    # Swap the buffer out so new telemetry doesn't race with the drain
+                    buffer, self.telemetry_buffer = self.telemetry_buffer, {}
+                    self._buffered_count = 0
+                    try:
+                        self._drain_telemetry(buffer)
+                    except Exception:
+                        # Nothing was committed; keep the batch for the next drain
+                        self._requeue_telemetry(buffer)
+                        raise
                     logger.debug("Processed telemetry buffer")
-                
-                await asyncio.sleep(60)  # Process every minute
+                failures = 0
                 
             except Exception as e:
+                failures += 1
                 logger.error(f"Error processing telemetry buffer: {e}")
-                await asyncio.sleep(30)
\ No newline at end of file
+                if await self._wait_or_stop(self._retry_delay(30, failures)):
+                    break
+            
+            # Checked after the drain so telemetry buffered before shutdown is flushed
+            if self._stop.is_set():
+                break
@@ -2,19 +2,79 @@
 Identity and Access Management Service for Zero Trust Architecture
 """
 
+import json
+import base64
+import struct
 import secrets
+import functools
 import pyotp
 import hashlib
-import os
+import hmac
+import ssl
+import threading
+import time
 from datetime import datetime, timedelta
 from typing import Optional, Dict, Any
 from fastapi import HTTPException, status
 from jose import JWTError, jwt
+from cachetools import TLRUCache
+from argon2 import PasswordHasher
+from argon2.exceptions import VerificationError, InvalidHashError
+from sqlalchemy import update, or_
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 from loguru import logger
 
 from ..models import User, UserSession, Device
-from ..database import get_db
+from ..database import get_db, get_redis_client
+
+
+# Parameters of the pre-Argon2 PBKDF2 hashes; only used to verify legacy hashes
+LEGACY_PBKDF2_HASH = "sha256"
+LEGACY_PBKDF2_ITERATIONS = 100000
+LEGACY_PBKDF2_SALT_LENGTH = 32  # bytes
+
+# Role privilege levels, higher includes lower
+_ROLE_LEVEL = {
+    "user": 1,
+    "admin": 2,
+    "security_admin": 3,
+    "system_admin": 4
+}
+
+
+@functools.lru_cache(maxsize=64)
+def _role_allowed(user_role: str, required_role: str) -> bool:
+    """Check a role against a required role (module-level so the cache doesn't hold self)"""
+    return _ROLE_LEVEL.get(user_role, 0) >= _ROLE_LEVEL.get(required_role, 0)
+
+
+# TOTP parameters (RFC 6238 defaults, matching pyotp)
+TOTP_INTERVAL = 30
+TOTP_DIGITS = 6
+
+
+@functools.lru_cache(maxsize=4096)
+def _decode_totp_secret(secret: str) -> bytes:
+    """Base32-decode an MFA secret once, padding it the way pyotp does"""
+    return base64.b32decode(secret + "=" * (-len(secret) % 8), casefold=True)
+
+
+def _totp_code(key: bytes, counter: int) -> str:
+    """Compute the TOTP code for a time-step counter (RFC 4226 dynamic truncation)"""
+    digest = hmac.new(key, struct.pack(">Q", counter), hashlib.sha1).digest()
+    offset = digest[-1] & 0x0F
+    code = struct.unpack(">I", digest[offset:offset + 4])[0] & 0x7FFFFFFF
+    return str(code % 10 ** TOTP_DIGITS).zfill(TOTP_DIGITS)
+
+
+# Verified JWT payloads are reused for at most this many seconds
+TOKEN_CACHE_TTL = 60
+
+
+def _token_cache_expiry(key: bytes, payload: Dict[str, Any], now: float) -> float:
+    """Expire cached tokens at their own exp claim, capped at TOKEN_CACHE_TTL"""
+    return min(now + TOKEN_CACHE_TTL, payload.get("exp", now))
 
 
 class IAMService:
@@ -22,31 +82,52 @@ class IAMService:
         self.secret_key = secret_key
         self.algorithm = algorithm
         self.ACCESS_TOKEN_EXPIRE_MINUTES = 30
+        
+        # hashlib.pbkdf2_hmac runs inside OpenSSL; record which build (and so
+        # which SHA-256 implementation, e.g. SHA-NI) backs legacy verification
+        logger.debug(f"Password hashing backed by {ssl.OPENSSL_VERSION}")
+        
+        # Verified token payloads keyed by token digest, so raw tokens aren't retained
+        self._token_cache = TLRUCache(maxsize=4096, ttu=_token_cache_expiry, timer=time.time)
+        self._token_cache_lock = threading.Lock()
+    
+    # Shared Argon2id hasher; parameters are encoded in every hash it produces
+    _password_hasher = PasswordHasher(time_cost=2, memory_cost=65536, parallelism=2)
     
     def get_password_hash(self, password: str) -> str:
-        """Hash a password using PBKDF2"""
-        # Generate a random salt
-        salt = os.urandom(32)
-        # Hash the password with PBKDF2
-        pwdhash = hashlib.pbkdf2_hmac('sha256', password.encode('utf-8'), salt, 100000)
-        # Combine salt and hash, encode as hex
-        return salt.hex() + pwdhash.hex()
+        """Hash a password using Argon2id"""
+        return self._password_hasher.hash(password)
     
     def verify_password(self, plain_password: str, hashed_password: str) -> bool:
         """Verify a password against its hash"""
+        if hashed_password.startswith("$argon2"):
+            try:
+                return self._password_hasher.verify(hashed_password, plain_password)
+            except (VerificationError, InvalidHashError):
+                return False
+        
+        # Legacy PBKDF2 hashes: hex salt followed by hex hash
         try:
-            # Extract salt (first 64 hex chars = 32 bytes) and hash (rest)
-            salt = bytes.fromhex(hashed_password[:64])
-            stored_hash = bytes.fromhex(hashed_password[64:])
+            # Decode once and slice, rather than decoding salt and hash separately
+            raw = bytes.fromhex(hashed_password)
+            salt = raw[:LEGACY_PBKDF2_SALT_LENGTH]
+            stored_hash = raw[LEGACY_PBKDF2_SALT_LENGTH:]
             
-            # Hash the provided password with the extracted salt
-            pwdhash = hashlib.pbkdf2_hmac('sha256', plain_password.encode('utf-8'), salt, 100000)
+            pwdhash = hashlib.pbkdf2_hmac(
+                LEGACY_PBKDF2_HASH, plain_password.encode('utf-8'), salt, LEGACY_PBKDF2_ITERATIONS
+            )
             
-            # Compare the hashes
-            return pwdhash == stored_hash
+            # Constant-time comparison to avoid leaking timing information
+            return hmac.compare_digest(pwdhash, stored_hash)
         except (ValueError, IndexError):
             return False
     
+    def password_needs_rehash(self, hashed_password: str) -> bool:
+        """Check whether a stored hash is legacy PBKDF2 or uses outdated Argon2 parameters"""
+        if not hashed_password.startswith("$argon2"):
+            return True
+        return self._password_hasher.check_needs_rehash(hashed_password)
+    
     def create_access_token(self, data: Dict[str, Any], expires_delta: Optional[timedelta] = None) -> str:
         """Create a JWT access token"""
         to_encode = data.copy()
@@ -61,9 +142,18 @@ class IAMService:
     
     def verify_token(self, token: str) -> Dict[str, Any]:
         """Verify and decode a JWT token"""
+        cache_key = hashlib.blake2b(token.encode("utf-8"), digest_size=16).digest()
+        with self._token_cache_lock:
+            payload = self._token_cache.get(cache_key)
+        # Callers get a copy, so changes to it never leak into the cached payload
+        if payload is not None:
+            return dict(payload)
+        
         try:
             payload = jwt.decode(token, self.secret_key, algorithms=[self.algorithm])
-            return payload
+            with self._token_cache_lock:
+                self._token_cache[cache_key] = payload
+            return dict(payload)
         except JWTError:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
@@ -95,10 +185,19 @@ class IAMService:
             db.commit()
             return None
         
+        # Upgrade legacy or outdated hashes now that the plaintext is known
+        needs_commit = False
+        if self.password_needs_rehash(user.hashed_password):
+            user.hashed_password = self.get_password_hash(password)
+            needs_commit = True
+        
         # Reset failed attempts on successful login
         if user.failed_login_attempts > 0:
             user.failed_login_attempts = 0
             user.locked_until = None
+            needs_commit = True
+        
+        if needs_commit:
             db.commit()
         
         return user
@@ -108,9 +207,17 @@ class IAMService:
         return pyotp.random_base32()
     
     def verify_mfa_token(self, secret: str, token: str) -> bool:
-        """Verify a MFA TOTP token"""
-        totp = pyotp.TOTP(secret)
-        return totp.verify(token, valid_window=1)
+        """Verify a MFA TOTP token, accepting one time step of clock drift either way"""
+        key = _decode_totp_secret(secret)
+        # Compare bytes, as pyotp does; compare_digest rejects non-ASCII str operands
+        token = str(token).encode("utf-8")
+        counter = int(time.time()) // TOTP_INTERVAL
+        
+        # Check every window so timing doesn't reveal which one matched
+        matched = False
+        for drift in (-1, 0, 1):
+            matched |= hmac.compare_digest(_totp_code(key, counter + drift).encode("ascii"), token)
+        return matched
     
     def get_mfa_qr_code_url(self, user_email: str, secret: str) -> str:
         """Generate QR code URL for MFA setup"""
@@ -159,34 +266,33 @@ class IAMService:
         return False
     
     def get_active_session(self, db: Session, session_id: str) -> Optional[UserSession]:
-        """Get an active session"""
-        session = db.query(UserSession).filter(
-            UserSession.session_id == session_id,
-            UserSession.is_active == True,
-            UserSession.expires_at > datetime.utcnow()
-        ).first()
-        
-        if session:
-            # Update last activity
-            session.last_activity = datetime.utcnow()
-            db.commit()
+        """Get an active session, touching its last activity in the same statement"""
+        now = datetime.utcnow()
+        session = db.execute(
+            update(UserSession)
+            .where(
+                UserSession.session_id == session_id,
+                UserSession.is_active == True,
+                UserSession.expires_at > now
+            )
+            .values(last_activity=now)
+            .returning(UserSession)
+        ).scalar_one_or_none()
+        db.commit()
         
         return session
     
     def create_user(self, db: Session, username: str, email: str, password: str, 
                    full_name: str, department: str, role: str) -> User:
         """Create a new user"""
-        # Check if user already exists
-        if db.query(User).filter(User.username == username).first():
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Username already registered"
-            )
-        
-        if db.query(User).filter(User.email == email).first():
+        # Check username and email uniqueness in one query, fetching only those columns
+        clash = db.query(User.username, User.email).filter(
+            or_(User.username == username, User.email == email)
+        ).first()
+        if clash:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Email already registered"
+                detail="Username already registered" if clash.username == username else "Email already registered"
             )
         
         hashed_password = self.get_password_hash(password)
@@ -200,7 +306,15 @@ class IAMService:
         )
         
         db.add(user)
-        db.commit()
+        try:
+            db.commit()
+        except IntegrityError:
+            # Lost a race with a concurrent registration; unique indexes caught it
+            db.rollback()
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Username or email already registered"
+            )
         db.refresh(user)
         
         logger.info(f"Created new user: {username}")
@@ -247,17 +361,7 @@ class IAMService:
     
     def check_user_permissions(self, user: User, required_role: str) -> bool:
         """Check if user has required permissions"""
-        role_hierarchy = {
-            "user": 1,
-            "admin": 2,
-            "security_admin": 3,
-            "system_admin": 4
-        }
-        
-        user_level = role_hierarchy.get(user.role, 0)
-        required_level = role_hierarchy.get(required_role, 0)
-        
-        return user_level >= required_level
+        return _role_allowed(user.role, required_role)
     
     def get_user_by_session(self, db: Session, session_id: str) -> Optional[User]:
         """Get user by session ID"""
@@ -276,6 +380,22 @@ class MicrosegmentationService:
             "iot": {"subnets": ["10.0.3.0/24"], "ports": [443, 8883, 1883]},
             "guest": {"subnets": ["10.0.4.0/24"], "ports": [80, 443]}
         }
+        
+        # Allowed inter-segment communication
+        self.allowed_flows = {
+            "admin": frozenset({"admin", "clinical", "iot", "guest"}),
+            "clinical": frozenset({"clinical", "iot"}),
+            "iot": frozenset({"iot"}),
+            "guest": frozenset({"guest"})
+        }
+        
+        # One 65536-bit bitmap per segment for O(1) port checks
+        self._port_bitmap = {}
+        for name, config in self.network_segments.items():
+            bitmap = bytearray(8192)
+            for port in config["ports"]:
+                bitmap[port >> 3] |= 1 << (port & 7)
+            self._port_bitmap[name] = bitmap
     
     def get_segment_for_device(self, device: Device, user: User) -> str:
         """Determine appropriate network segment for device/user combination"""
@@ -290,20 +410,15 @@ class MicrosegmentationService:
     
     def validate_network_access(self, source_segment: str, dest_segment: str, port: int) -> bool:
         """Validate if network access is allowed between segments"""
-        # Define allowed inter-segment communication
-        allowed_flows = {
-            "admin": ["admin", "clinical", "iot", "guest"],
-            "clinical": ["clinical", "iot"],
-            "iot": ["iot"],
-            "guest": ["guest"]
-        }
-        
-        if dest_segment not in allowed_flows.get(source_segment, []):
+        if dest_segment not in self.allowed_flows.get(source_segment, ()):
             return False
         
-        # Check if port is allowed for destination segment
-        allowed_ports = self.network_segments.get(dest_segment, {}).get("ports", [])
-        return port in allowed_ports
+        # Check if port is allowed for destination segment; non-integer ports
+        # (e.g. strings from request data) are rejected rather than raising
+        if not isinstance(port, int) or not 0 <= port <= 65535:
+            return False
+        bitmap = self._port_bitmap.get(dest_segment)
+        return bitmap is not None and bool(bitmap[port >> 3] & (1 << (port & 7)))
     
     def generate_firewall_rules(self, device: Device, user: User) -> Dict[str, Any]:
         """Generate firewall rules for a device"""
@@ -328,45 +443,49 @@ class MicrosegmentationService:
 
 # Secure Access Proxy Service
 class SecureAccessProxyService:
-    def __init__(self):
-        self.proxy_rules = {}
+    def __init__(self, redis_host: str = "localhost", redis_port: int = 6379):
+        # Sessions live in Redis so every worker sees the same state
+        self.redis_client = get_redis_client(redis_host, redis_port)
+        self.SESSION_TTL = 7200  # 2 hours
     
     def create_proxy_session(self, user: User, device: Device, target_resource: str) -> Dict[str, Any]:
         """Create a secure proxy session"""
         session_id = secrets.token_urlsafe(16)
+        created_at = datetime.utcnow()
         
         proxy_session = {
             "session_id": session_id,
             "user_id": user.id,
             "device_id": device.id,
             "target_resource": target_resource,
-            "created_at": datetime.utcnow(),
-            "expires_at": datetime.utcnow() + timedelta(hours=2),
+            "created_at": created_at,
+            "expires_at": created_at + timedelta(seconds=self.SESSION_TTL),
             "is_active": True
         }
         
-        self.proxy_rules[session_id] = proxy_session
+        # Redis expires the session, no manual expiry bookkeeping needed
+        self.redis_client.setex(
+            f"proxy:{session_id}",
+            self.SESSION_TTL,
+            json.dumps(proxy_session, default=str)
+        )
         logger.info(f"Created proxy session {session_id} for user {user.username}")
         
         return proxy_session
     
     def validate_proxy_access(self, session_id: str, request_path: str) -> bool:
         """Validate if proxy access is allowed"""
-        session = self.proxy_rules.get(session_id)
-        if not session or not session["is_active"]:
-            return False
-        
-        if session["expires_at"] < datetime.utcnow():
-            session["is_active"] = False
+        session_data = self.redis_client.get(f"proxy:{session_id}")
+        if not session_data:
             return False
         
         # Validate if the request path matches allowed resource
+        session = json.loads(session_data)
         return request_path.startswith(session["target_resource"])
     
     def terminate_proxy_session(self, session_id: str) -> bool:
         """Terminate a proxy session"""
-        if session_id in self.proxy_rules:
-            self.proxy_rules[session_id]["is_active"] = False
+        if self.redis_client.delete(f"proxy:{session_id}"):
             logger.info(f"Terminated proxy session {session_id}")
             return True
-        return False
\ No newline at end of file
+        return False
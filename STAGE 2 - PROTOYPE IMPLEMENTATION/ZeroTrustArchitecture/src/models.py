@@ -3,9 +3,9 @@ Database models for Zero Trust Architecture
 """
 
 from datetime import datetime
-from enum import Enum
+from enum import Enum, IntEnum
 from typing import Optional, List
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, Float, Text, ForeignKey, JSON
+from sqlalchemy import Column, Integer, SmallInteger, String, DateTime, Boolean, Float, Text, ForeignKey, JSON, Index, text
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship, Session
 from pydantic import BaseModel
@@ -33,6 +33,22 @@ class ResponseAction(str, Enum):
     ALERT_ADMIN = "alert_admin"
 
 
+class ResponseStatus(IntEnum):
+    PENDING = 0
+    EXECUTING = 1
+    COMPLETED = 2
+    FAILED = 3
+    CANCELLED = 4
+    
+    @classmethod
+    def from_stored(cls, value) -> "ResponseStatus":
+        """Decode a stored status, including the names databases created before the
+        column held codes still store ("completed", or "executed" for completed)"""
+        if isinstance(value, str) and not value.isdigit():
+            return cls.COMPLETED if value == "executed" else cls[value.upper()]
+        return cls(int(value))
+
+
 # Database Models
 class User(Base):
     __tablename__ = "users"
@@ -69,8 +85,8 @@ class Device(Base):
     ip_address = Column(String, nullable=True)
     os_version = Column(String, nullable=True)
     last_seen = Column(DateTime, nullable=True)
-    is_compliant = Column(Boolean, default=False)
-    is_quarantined = Column(Boolean, default=False)
+    is_compliant = Column(Boolean, default=False, index=True)
+    is_quarantined = Column(Boolean, default=False, index=True)
     trust_score = Column(Float, default=0.0)
     owner_id = Column(Integer, ForeignKey("users.id"), nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
@@ -84,6 +100,20 @@ class Device(Base):
 
 class UserSession(Base):
     __tablename__ = "user_sessions"
+    __table_args__ = (
+        # Active-session lookups filter on session_id, is_active and expires_at
+        Index(
+            "ix_user_sessions_active", "session_id", "expires_at",
+            postgresql_where=text("is_active"),
+            sqlite_where=text("is_active = 1")
+        ),
+        # Revoking a user's access deactivates their active sessions by user_id
+        Index(
+            "ix_user_sessions_user_active", "user_id",
+            postgresql_where=text("is_active"),
+            sqlite_where=text("is_active = 1")
+        ),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     session_id = Column(String, unique=True, index=True, nullable=False)
@@ -102,6 +132,19 @@ class UserSession(Base):
 
 class SecurityEvent(Base):
     __tablename__ = "security_events"
+    __table_args__ = (
+        # Unresolved events only; resolved history doesn't bloat the index
+        Index(
+            "ix_security_events_threat_resolved_created", "threat_level", "is_resolved", "created_at",
+            postgresql_where=text("is_resolved = false"),
+            sqlite_where=text("is_resolved = 0")
+        ),
+        Index("ix_security_events_device_resolved", "device_id", "is_resolved"),
+        # Newest-first listings, overall and per device; B-tree indexes are
+        # scanned backwards for ORDER BY created_at DESC ... LIMIT
+        Index("ix_security_events_created_at", "created_at"),
+        Index("ix_security_events_device_created", "device_id", "created_at"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     event_id = Column(String, unique=True, index=True, nullable=False)
@@ -130,7 +173,7 @@ class ResponseActionModel(Base):
     action_type = Column(String, nullable=False)  # ResponseAction enum
     description = Column(Text, nullable=False)
     is_automated = Column(Boolean, default=True)
-    status = Column(String, default="pending")  # pending, executed, failed
+    status = Column(SmallInteger, default=ResponseStatus.PENDING)  # ResponseStatus code
     executed_at = Column(DateTime, nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
     
@@ -156,6 +199,14 @@ class DevicePosture(Base):
 
 class ThreatIntelligence(Base):
     __tablename__ = "threat_intelligence"
+    __table_args__ = (
+        # IOC checks look up active indicators by type and value
+        Index(
+            "ix_threat_intelligence_active_type_value", "ioc_type", "ioc_value",
+            postgresql_where=text("is_active"),
+            sqlite_where=text("is_active = 1")
+        ),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     ioc_type = Column(String, nullable=False)  # ip, domain, hash, etc.
@@ -179,21 +230,6 @@ class UserCreate(BaseModel):
     role: str
 
 
-class UserResponse(BaseModel):
-    id: int
-    username: str
-    email: str
-    full_name: str
-    department: str
-    role: str
-    is_active: bool
-    is_mfa_enabled: bool
-    created_at: datetime
-
-    class Config:
-        from_attributes = True
-
-
 class DeviceCreate(BaseModel):
     device_id: str
     device_name: str
@@ -203,22 +239,6 @@ class DeviceCreate(BaseModel):
     os_version: Optional[str] = None
 
 
-class DeviceResponse(BaseModel):
-    id: int
-    device_id: str
-    device_name: str
-    device_type: str
-    mac_address: str
-    ip_address: Optional[str]
-    is_compliant: bool
-    is_quarantined: bool
-    trust_score: float
-    last_seen: Optional[datetime]
-
-    class Config:
-        from_attributes = True
-
-
 class SecurityEventCreate(BaseModel):
     event_type: str
     device_id: Optional[int] = None
@@ -229,20 +249,6 @@ class SecurityEventCreate(BaseModel):
     raw_data: Optional[dict] = None
 
 
-class SecurityEventResponse(BaseModel):
-    id: int
-    event_id: str
-    event_type: str
-    threat_level: str
-    confidence_score: float
-    description: str
-    is_resolved: bool
-    created_at: datetime
-
-    class Config:
-        from_attributes = True
-
-
 class LoginRequest(BaseModel):
     username: str
     password: str
@@ -254,12 +260,6 @@ class MFAVerifyRequest(BaseModel):
     mfa_code: str
 
 
-class Token(BaseModel):
-    access_token: str
-    token_type: str
-    expires_in: int
-
-
 class DevicePostureUpdate(BaseModel):
     device_id: int
     antivirus_enabled: bool
@@ -3,37 +3,34 @@ Response System for Zero Trust Architecture
 Handles incident response and automated response actions
 """
 
-import json
 import asyncio
+import hashlib
 import smtplib
+import threading
+import time
 import uuid
+from collections import defaultdict
+from types import MappingProxyType
 from datetime import datetime, timedelta
-from typing import Dict, Any, List, Optional, Callable
-from enum import Enum
-from dataclasses import dataclass
+from typing import Dict, Any, List, Optional, Callable, Mapping, Tuple
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
+from cachetools import TTLCache
+from sqlalchemy import insert, update
 from sqlalchemy.orm import Session
 from loguru import logger
 import redis
+import orjson
+import msgspec
 
 from ..models import (
     SecurityEvent, Device, ResponseActionModel, User, UserSession,
-    ThreatLevel, ResponseAction
+    ThreatLevel, ResponseAction, ResponseStatus
 )
-from ..database import db_manager
+from ..database import DASHBOARD_CACHE_KEY, db_manager, device_details_version_key, get_redis_client
 
 
-class ResponseStatus(str, Enum):
-    PENDING = "pending"
-    EXECUTING = "executing"
-    COMPLETED = "completed"
-    FAILED = "failed"
-    CANCELLED = "cancelled"
-
-
-@dataclass
-class ResponseActionConfig:
+class ResponseActionConfig(msgspec.Struct, frozen=True, gc=False):
     """Configuration for response actions"""
     action_type: ResponseAction
     severity_threshold: str
@@ -44,12 +41,137 @@ class ResponseActionConfig:
     description: str
 
 
+# Stored timestamps are naive UTC; serialize them as explicit UTC
+ORJSON_OPTIONS = orjson.OPT_NAIVE_UTC | orjson.OPT_UTC_Z
+
+
+# Last formatted second and its ISO string, shared by incident timestamps; incident
+# bookkeeping runs on executor threads, so updates hold the lock
+_iso_second_cache = [0, ""]
+_iso_second_lock = threading.Lock()
+
+
+def iso_now_cached() -> str:
+    """Current UTC time as an ISO string, reformatted at most once per second"""
+    now = int(time.time())
+    with _iso_second_lock:
+        if now != _iso_second_cache[0]:
+            _iso_second_cache[1] = datetime.utcfromtimestamp(now).isoformat()
+            _iso_second_cache[0] = now
+        return _iso_second_cache[1]
+
+
+# Incidents are stored as Redis hashes; these fields hold JSON, the rest are plain strings
+INCIDENT_JSON_FIELDS = frozenset({
+    "priority", "escalation_level", "device_id", "user_id",
+    "source_events", "correlations", "timeline", "response_actions"
+})
+INCIDENT_TTL = 86400  # 24 hours
+
+
+def _encode_incident_fields(fields: Dict[str, Any]) -> Dict[str, Any]:
+    """Encode incident fields for HSET, JSON-encoding only the non-string fields"""
+    return {
+        name: orjson.dumps(value) if name in INCIDENT_JSON_FIELDS else value
+        for name, value in fields.items()
+    }
+
+
+def _decode_incident(raw: Dict[str, str]) -> Dict[str, Any]:
+    """Decode an HGETALL reply back into an incident dict"""
+    return {
+        name: orjson.loads(value) if name in INCIDENT_JSON_FIELDS else value
+        for name, value in raw.items()
+    }
+
+
+# Response action configurations, built once at import and shared read-only
+RESPONSE_CONFIGS: Mapping[ResponseAction, ResponseActionConfig] = MappingProxyType({
+    ResponseAction.ISOLATE_DEVICE: ResponseActionConfig(
+        action_type=ResponseAction.ISOLATE_DEVICE,
+        severity_threshold="high",
+        auto_execute=True,
+        confirmation_required=False,
+        timeout_seconds=300,
+        escalation_delay_minutes=15,
+        description="Isolate device from network"
+    ),
+    ResponseAction.QUARANTINE: ResponseActionConfig(
+        action_type=ResponseAction.QUARANTINE,
+        severity_threshold="medium",
+        auto_execute=True,
+        confirmation_required=False,
+        timeout_seconds=600,
+        escalation_delay_minutes=30,
+        description="Quarantine device with limited network access"
+    ),
+    ResponseAction.REVOKE_ACCESS: ResponseActionConfig(
+        action_type=ResponseAction.REVOKE_ACCESS,
+        severity_threshold="high",
+        auto_execute=True,
+        confirmation_required=True,
+        timeout_seconds=120,
+        escalation_delay_minutes=10,
+        description="Revoke user access and terminate sessions"
+    ),
+    ResponseAction.ALERT_ADMIN: ResponseActionConfig(
+        action_type=ResponseAction.ALERT_ADMIN,
+        severity_threshold="low",
+        auto_execute=True,
+        confirmation_required=False,
+        timeout_seconds=60,
+        escalation_delay_minutes=5,
+        description="Send alert to administrators"
+    )
+})
+
+
+def _build_action_table() -> Tuple[Tuple[ResponseAction, ...], ...]:
+    """Evaluate the response rules once for every risk bucket and flag combination"""
+    table = []
+    for key in range(3 << 4):
+        risk_bucket = key >> 4
+        has_threat_intel, has_user, ml_anomaly, is_high_threat = key & 8, key & 4, key & 2, key & 1
+        actions = []
+        
+        # Critical risk score - isolate device
+        if risk_bucket == 2:
+            actions += [ResponseAction.ISOLATE_DEVICE, ResponseAction.ALERT_ADMIN]
+        
+        # High risk score - quarantine
+        elif risk_bucket == 1:
+            actions += [ResponseAction.QUARANTINE, ResponseAction.ALERT_ADMIN]
+        
+        # Threat intelligence matches - quarantine and revoke access
+        if has_threat_intel:
+            if ResponseAction.QUARANTINE not in actions:
+                actions.append(ResponseAction.QUARANTINE)
+            if has_user:  # Only revoke if there's a user associated
+                actions.append(ResponseAction.REVOKE_ACCESS)
+        
+        # ML anomalies and high/critical events always alert
+        if (ml_anomaly or is_high_threat) and ResponseAction.ALERT_ADMIN not in actions:
+            actions.append(ResponseAction.ALERT_ADMIN)
+        
+        table.append(tuple(actions))
+    return tuple(table)
+
+
+# Recommended actions keyed by risk_bucket << 4 | threat_intel << 3 | user << 2 | ml_anomaly << 1 | high_threat
+ACTION_TABLE = _build_action_table()
+HIGH_THREAT_LEVELS = frozenset({ThreatLevel.HIGH, ThreatLevel.CRITICAL})
+
+
 class IncidentResponseService:
     """Service for managing security incidents and their response"""
     
     def __init__(self, redis_client):
         self.redis_client = redis_client
-        self.incidents = {}  # In-memory incident store
+        # In-memory incident mirror, bounded and expiring with the 24h Redis TTL.
+        # Incidents are created and updated from executor threads, so the cache
+        # and the incident dicts it holds are only touched under the lock
+        self.incidents = TTLCache(maxsize=10_000, ttl=INCIDENT_TTL)
+        self._incidents_lock = threading.Lock()
         self.escalation_rules = {
             ThreatLevel.LOW: {"timeout": 3600, "escalate_to": "security_team"},
             ThreatLevel.MEDIUM: {"timeout": 1800, "escalate_to": "security_admin"},
@@ -63,7 +185,8 @@ class IncidentResponseService:
                        correlations: List[Dict] = None) -> Dict[str, Any]:
         """Create a new security incident"""
         try:
-            incident_id = f"INC-{datetime.utcnow().strftime('%Y%m%d')}-{str(uuid.uuid4())[:8]}"
+            now = iso_now_cached()
+            incident_id = f"INC-{now[:10].replace('-', '')}-{str(uuid.uuid4())[:8]}"
             
             # Determine incident severity based on event and correlations
             incident_severity = self._determine_incident_severity(event, correlations)
@@ -75,8 +198,8 @@ class IncidentResponseService:
                 "severity": incident_severity,
                 "status": "open",
                 "priority": self._calculate_priority(incident_severity, event),
-                "created_at": datetime.utcnow().isoformat(),
-                "updated_at": datetime.utcnow().isoformat(),
+                "created_at": now,
+                "updated_at": now,
                 "assigned_to": self._auto_assign_incident(incident_severity),
                 "device_id": event.device_id,
                 "user_id": event.user_id,
@@ -84,7 +207,7 @@ class IncidentResponseService:
                 "correlations": [c.get("correlation_id") for c in (correlations or [])],
                 "timeline": [
                     {
-                        "timestamp": datetime.utcnow().isoformat(),
+                        "timestamp": now,
                         "action": "incident_created",
                         "description": f"Incident created from event {event.event_id}",
                         "user": "system"
@@ -95,20 +218,22 @@ class IncidentResponseService:
             }
             
             # Store incident
-            self.incidents[incident_id] = incident
+            with self._incidents_lock:
+                self.incidents[incident_id] = incident
             
-            # Store in Redis for persistence
-            self.redis_client.setex(
-                f"incident:{incident_id}",
-                86400,  # 24 hours
-                json.dumps(incident)
-            )
+            # Store in Redis for persistence and index it as open
+            incident_key = f"incident:{incident_id}"
+            pipe = self.redis_client.pipeline(transaction=False)
+            pipe.hset(incident_key, mapping=_encode_incident_fields(incident))
+            pipe.expire(incident_key, INCIDENT_TTL)
+            pipe.zadd("incidents:open:byprio", {incident_id: self._priority_score(incident)})
+            pipe.execute()
             
-            logger.info(f"Created incident {incident_id} for event {event.event_id}")
+            logger.info("Created incident {} for event {}", incident_id, event.event_id)
             return incident
             
         except Exception as e:
-            logger.error(f"Error creating incident: {e}")
+            logger.error("Error creating incident: {}", e)
             raise
     
     def update_incident(self, incident_id: str, updates: Dict[str, Any]) -> bool:
@@ -116,78 +241,106 @@ class IncidentResponseService:
         try:
             incident = self.get_incident(incident_id)
             if not incident:
-                logger.error(f"Incident not found: {incident_id}")
+                logger.error("Incident not found: {}", incident_id)
                 return False
             
-            # Update fields
-            incident.update(updates)
-            incident["updated_at"] = datetime.utcnow().isoformat()
-            
-            # Add to timeline
-            if "timeline_entry" in updates:
-                incident["timeline"].append({
-                    "timestamp": datetime.utcnow().isoformat(),
-                    "action": updates.get("action", "update"),
-                    "description": updates["timeline_entry"],
-                    "user": updates.get("user", "system")
-                })
-            
-            # Update storage
-            self.incidents[incident_id] = incident
-            self.redis_client.setex(
-                f"incident:{incident_id}",
-                86400,
-                json.dumps(incident)
-            )
+            now = iso_now_cached()
+            with self._incidents_lock:
+                # Update fields, tracking which ones need writing back
+                incident.update(updates)
+                incident["updated_at"] = now
+                dirty = dict(updates, updated_at=now)
+                
+                # Add to timeline
+                if "timeline_entry" in updates:
+                    incident["timeline"].append({
+                        "timestamp": now,
+                        "action": updates.get("action", "update"),
+                        "description": updates["timeline_entry"],
+                        "user": updates.get("user", "system")
+                    })
+                    dirty["timeline"] = list(incident["timeline"])
+                
+                self.incidents[incident_id] = incident
+                is_open = incident.get("status") == "open"
+                priority_score = self._priority_score(incident) if is_open else None
+            
+            # Write only the changed fields, keeping the open index in step with the status
+            incident_key = f"incident:{incident_id}"
+            pipe = self.redis_client.pipeline(transaction=False)
+            pipe.hset(incident_key, mapping=_encode_incident_fields(dirty))
+            pipe.expire(incident_key, INCIDENT_TTL)
+            if is_open:
+                pipe.zadd("incidents:open:byprio", {incident_id: priority_score})
+            else:
+                pipe.zrem("incidents:open:byprio", incident_id)
+            pipe.execute()
             
-            logger.debug(f"Updated incident {incident_id}")
+            logger.debug("Updated incident {}", incident_id)
             return True
             
         except Exception as e:
-            logger.error(f"Error updating incident: {e}")
+            logger.error("Error updating incident: {}", e)
             return False
     
     def get_incident(self, incident_id: str) -> Optional[Dict[str, Any]]:
         """Get incident by ID"""
         try:
             # Check memory first
-            if incident_id in self.incidents:
-                return self.incidents[incident_id]
+            with self._incidents_lock:
+                incident = self.incidents.get(incident_id)
+            if incident is not None:
+                return incident
             
             # Check Redis
-            incident_data = self.redis_client.get(f"incident:{incident_id}")
+            incident_data = self.redis_client.hgetall(f"incident:{incident_id}")
             if incident_data:
-                incident = json.loads(incident_data)
-                self.incidents[incident_id] = incident
+                incident = _decode_incident(incident_data)
+                with self._incidents_lock:
+                    # Keep the copy another thread may have cached meanwhile
+                    incident = self.incidents.setdefault(incident_id, incident)
                 return incident
             
             return None
             
         except Exception as e:
-            logger.error(f"Error getting incident: {e}")
+            logger.error("Error getting incident: {}", e)
             return None
     
-    def list_open_incidents(self) -> List[Dict[str, Any]]:
-        """List all open incidents"""
+    def list_open_incidents(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """List open incidents, highest priority and newest first"""
         try:
             open_incidents = []
             
-            # Get incident keys from Redis
-            incident_keys = self.redis_client.keys("incident:*")
-            
-            for key in incident_keys:
-                incident_data = self.redis_client.get(key)
-                if incident_data:
-                    incident = json.loads(incident_data)
-                    if incident.get("status") == "open":
-                        open_incidents.append(incident)
+            # The index is scored by priority then creation time, so Redis returns
+            # IDs already ordered and only the requested page is fetched
+            incident_ids = self.redis_client.zrevrange(
+                "incidents:open:byprio", 0, -1 if limit is None else limit - 1
+            )
+            if not incident_ids:
+                return []
+            pipe = self.redis_client.pipeline(transaction=False)
+            for incident_id in incident_ids:
+                pipe.hgetall(f"incident:{incident_id}")
+            incident_hashes = pipe.execute()
+            
+            expired = []
+            for incident_id, incident_data in zip(incident_ids, incident_hashes):
+                if not incident_data:
+                    expired.append(incident_id)
+                    continue
+                incident = _decode_incident(incident_data)
+                if incident.get("status") == "open":
+                    open_incidents.append(incident)
+            
+            # Drop index entries whose incident record has expired
+            if expired:
+                self.redis_client.zrem("incidents:open:byprio", *expired)
             
-            # Sort by priority and creation time
-            open_incidents.sort(key=lambda x: (x.get("priority", 0), x.get("created_at")), reverse=True)
             return open_incidents
             
         except Exception as e:
-            logger.error(f"Error listing open incidents: {e}")
+            logger.error("Error listing open incidents: {}", e)
             return []
     
     def escalate_incident(self, incident_id: str, reason: str) -> bool:
@@ -220,7 +373,7 @@ class IncidentResponseService:
             return self.update_incident(incident_id, updates)
             
         except Exception as e:
-            logger.error(f"Error escalating incident: {e}")
+            logger.error("Error escalating incident: {}", e)
             return False
     
     def close_incident(self, incident_id: str, resolution: str, user: str = "system") -> bool:
@@ -229,7 +382,7 @@ class IncidentResponseService:
             updates = {
                 "status": "closed",
                 "resolution": resolution,
-                "closed_at": datetime.utcnow().isoformat(),
+                "closed_at": iso_now_cached(),
                 "timeline_entry": f"Incident closed: {resolution}",
                 "action": "closed",
                 "user": user
@@ -238,9 +391,14 @@ class IncidentResponseService:
             return self.update_incident(incident_id, updates)
             
         except Exception as e:
-            logger.error(f"Error closing incident: {e}")
+            logger.error("Error closing incident: {}", e)
             return False
     
+    def _priority_score(self, incident: Dict[str, Any]) -> float:
+        """Sort score for the open-incident index: priority first, then creation time"""
+        created_epoch = int(datetime.fromisoformat(incident["created_at"]).timestamp())
+        return incident.get("priority", 0) * 1e10 + created_epoch
+    
     def _determine_incident_severity(self, event: SecurityEvent, 
                                    correlations: List[Dict] = None) -> str:
         """Determine incident severity based on event and correlations"""
@@ -290,112 +448,52 @@ class AutomatedResponseService:
     
     def __init__(self, redis_client):
         self.redis_client = redis_client
-        self.response_configs = self._initialize_response_configs()
-        self.notification_service = NotificationService()
+        self.notification_service = NotificationService(redis_client)
         
         logger.info("Automated Response Service initialized")
     
-    def _initialize_response_configs(self) -> Dict[ResponseAction, ResponseActionConfig]:
-        """Initialize response action configurations"""
-        return {
-            ResponseAction.ISOLATE_DEVICE: ResponseActionConfig(
-                action_type=ResponseAction.ISOLATE_DEVICE,
-                severity_threshold="high",
-                auto_execute=True,
-                confirmation_required=False,
-                timeout_seconds=300,
-                escalation_delay_minutes=15,
-                description="Isolate device from network"
-            ),
-            ResponseAction.QUARANTINE: ResponseActionConfig(
-                action_type=ResponseAction.QUARANTINE,
-                severity_threshold="medium",
-                auto_execute=True,
-                confirmation_required=False,
-                timeout_seconds=600,
-                escalation_delay_minutes=30,
-                description="Quarantine device with limited network access"
-            ),
-            ResponseAction.REVOKE_ACCESS: ResponseActionConfig(
-                action_type=ResponseAction.REVOKE_ACCESS,
-                severity_threshold="high",
-                auto_execute=True,
-                confirmation_required=True,
-                timeout_seconds=120,
-                escalation_delay_minutes=10,
-                description="Revoke user access and terminate sessions"
-            ),
-            ResponseAction.ALERT_ADMIN: ResponseActionConfig(
-                action_type=ResponseAction.ALERT_ADMIN,
-                severity_threshold="low",
-                auto_execute=True,
-                confirmation_required=False,
-                timeout_seconds=60,
-                escalation_delay_minutes=5,
-                description="Send alert to administrators"
-            )
-        }
-    
     def evaluate_response_actions(self, db: Session, event: SecurityEvent, 
                                 analysis_results: Dict[str, Any]) -> List[ResponseAction]:
         """Evaluate which response actions should be taken"""
-        recommended_actions = []
-        
         try:
             risk_score = analysis_results.get("risk_score", 0)
-            threat_intel_matches = analysis_results.get("threat_intel_matches", [])
-            ml_anomaly = analysis_results.get("ml_anomaly", False)
-            
-            # Critical risk score - isolate device
-            if risk_score > 0.9:
-                recommended_actions.append(ResponseAction.ISOLATE_DEVICE)
-                recommended_actions.append(ResponseAction.ALERT_ADMIN)
-            
-            # High risk score - quarantine
-            elif risk_score > 0.7:
-                recommended_actions.append(ResponseAction.QUARANTINE)
-                recommended_actions.append(ResponseAction.ALERT_ADMIN)
-            
-            # Threat intelligence matches - quarantine and revoke access
-            if threat_intel_matches:
-                if not ResponseAction.QUARANTINE in recommended_actions:
-                    recommended_actions.append(ResponseAction.QUARANTINE)
-                if event.user_id:  # Only revoke if there's a user associated
-                    recommended_actions.append(ResponseAction.REVOKE_ACCESS)
-            
-            # ML anomaly detected
-            if ml_anomaly:
-                recommended_actions.append(ResponseAction.ALERT_ADMIN)
-            
-            # Always alert on high/critical events
-            if event.threat_level in [ThreatLevel.HIGH, ThreatLevel.CRITICAL]:
-                if ResponseAction.ALERT_ADMIN not in recommended_actions:
-                    recommended_actions.append(ResponseAction.ALERT_ADMIN)
-            
-            return recommended_actions
+            risk_bucket = 2 if risk_score > 0.9 else 1 if risk_score > 0.7 else 0
+            
+            key = (
+                risk_bucket << 4
+                | bool(analysis_results.get("threat_intel_matches")) << 3
+                | bool(event.user_id) << 2
+                | bool(analysis_results.get("ml_anomaly", False)) << 1
+                | (event.threat_level in HIGH_THREAT_LEVELS)
+            )
+            return list(ACTION_TABLE[key])
             
         except Exception as e:
-            logger.error(f"Error evaluating response actions: {e}")
+            logger.error("Error evaluating response actions: {}", e)
             return [ResponseAction.ALERT_ADMIN]  # Fallback to alert
     
     async def execute_response_action(self, db: Session, action_type: ResponseAction,
                                     event: SecurityEvent, context: Dict[str, Any]) -> bool:
         """Execute a specific response action"""
+        # Action records are write-only here, so they go through Core rather than the ORM unit of work
+        actions_table = ResponseActionModel.__table__
+        action_values = None
         try:
-            action_id = f"action_{action_type}_{datetime.utcnow().timestamp()}"
-            
-            # Create response action record
-            response_action = ResponseActionModel(
-                action_id=action_id,
-                event_id=event.id,
-                action_type=action_type,
-                description=self.response_configs[action_type].description,
-                is_automated=True,
-                status=ResponseStatus.EXECUTING
-            )
+            action_values = {
+                "action_id": f"action_{action_type}_{datetime.utcnow().timestamp()}",
+                "event_id": event.id,
+                "action_type": action_type,
+                "description": RESPONSE_CONFIGS[action_type].description,
+                "is_automated": True
+            }
             
-            db.add(response_action)
-            db.commit()
+            # Create response action record; it shares one transaction with the
+            # action's own changes, committed once the outcome is known
+            action_row_id = db.execute(
+                insert(actions_table).values(
+                    **action_values, status=ResponseStatus.EXECUTING
+                ).returning(actions_table.c.id)
+            ).scalar_one()
             
             # Execute the specific action
             success = False
@@ -409,21 +507,43 @@ class AutomatedResponseService:
                 success = await self._alert_administrators(db, event, context)
             
             # Update action status
-            response_action.status = ResponseStatus.COMPLETED if success else ResponseStatus.FAILED
-            response_action.executed_at = datetime.utcnow()
-            db.commit()
+            if success:
+                db.execute(
+                    update(actions_table).where(actions_table.c.id == action_row_id).values(
+                        status=ResponseStatus.COMPLETED,
+                        executed_at=datetime.utcnow()
+                    )
+                )
+                db.commit()
+            else:
+                self._record_failed_action(db, action_values)
             
-            logger.info(f"Executed response action {action_type} with result: {success}")
+            logger.info("Executed response action {} with result: {}", action_type, success)
             return success
             
         except Exception as e:
-            logger.error(f"Error executing response action {action_type}: {e}")
+            logger.error("Error executing response action {}: {}", action_type, e)
             # Update status to failed
-            if 'response_action' in locals():
-                response_action.status = ResponseStatus.FAILED
-                db.commit()
+            if action_values is not None:
+                self._record_failed_action(db, action_values)
             return False
     
+    def _record_failed_action(self, db: Session, action_values: Dict[str, Any]) -> None:
+        """Discard a failed action's partial changes and record the failure in a fresh transaction"""
+        try:
+            db.rollback()
+            db.execute(
+                insert(ResponseActionModel.__table__).values(
+                    **action_values,
+                    status=ResponseStatus.FAILED,
+                    executed_at=datetime.utcnow()
+                )
+            )
+            db.commit()
+        except Exception as e:
+            logger.error("Error recording failed response action {}: {}", action_values['action_id'], e)
+            db.rollback()
+    
     async def _isolate_device(self, db: Session, event: SecurityEvent, 
                             context: Dict[str, Any]) -> bool:
         """Isolate device from network"""
@@ -437,17 +557,18 @@ class AutomatedResponseService:
             device.is_quarantined = True
             device.trust_score = 0.0  # Zero trust score for isolated devices
             
-            # Store isolation reason in Redis
+            # Store isolation reason and firewall rules in one round-trip
             isolation_key = f"isolation:{device.device_id}"
-            self.redis_client.setex(
+            pipe = self.redis_client.pipeline(transaction=False)
+            pipe.setex(
                 isolation_key,
                 86400 * 7,  # 7 days
-                json.dumps({
+                orjson.dumps({
                     "reason": f"Automated isolation due to {event.event_type}",
                     "event_id": event.event_id,
-                    "timestamp": datetime.utcnow().isoformat(),
+                    "timestamp": datetime.utcnow(),
                     "risk_score": context.get("risk_score", 0)
-                })
+                }, option=ORJSON_OPTIONS)
             )
             
             # Generate firewall rules to block all traffic
@@ -458,20 +579,20 @@ class AutomatedResponseService:
                     {"direction": "inbound", "action": "deny", "ports": "all"},
                     {"direction": "outbound", "action": "deny", "ports": "all"}
                 ],
-                "created_at": datetime.utcnow().isoformat()
+                "created_at": datetime.utcnow()
             }
             
-            # Store firewall rules
-            self.redis_client.setex(
+            pipe.setex(
                 f"firewall:{device.device_id}",
                 86400 * 7,
-                json.dumps(firewall_rules)
+                orjson.dumps(firewall_rules, option=ORJSON_OPTIONS)
             )
+            pipe.delete(DASHBOARD_CACHE_KEY)  # Cached dashboard shows the old device state
+            pipe.incr(device_details_version_key(device.device_id))
+            pipe.execute()
             
-            db.commit()
-            
-            # Send notification
-            await self.notification_service.send_notification({
+            # Notify with the next digest; the action doesn't depend on delivery
+            self.notification_service.queue_notification({
                 "type": "device_isolated",
                 "device_id": device.device_id,
                 "device_name": device.device_name,
@@ -479,11 +600,11 @@ class AutomatedResponseService:
                 "severity": "critical"
             })
             
-            logger.info(f"Successfully isolated device {device.device_id}")
+            logger.info("Successfully isolated device {}", device.device_id)
             return True
             
         except Exception as e:
-            logger.error(f"Error isolating device: {e}")
+            logger.error("Error isolating device: {}", e)
             return False
     
     async def _quarantine_device(self, db: Session, event: SecurityEvent, 
@@ -499,17 +620,18 @@ class AutomatedResponseService:
             device.is_quarantined = True
             device.trust_score = max(device.trust_score - 0.3, 0.1)  # Reduce trust score
             
-            # Store quarantine reason
+            # Store quarantine reason and firewall rules in one round-trip
             quarantine_key = f"quarantine:{device.device_id}"
-            self.redis_client.setex(
+            pipe = self.redis_client.pipeline(transaction=False)
+            pipe.setex(
                 quarantine_key,
                 86400,  # 24 hours
-                json.dumps({
+                orjson.dumps({
                     "reason": f"Automated quarantine due to {event.event_type}",
                     "event_id": event.event_id,
-                    "timestamp": datetime.utcnow().isoformat(),
+                    "timestamp": datetime.utcnow(),
                     "risk_score": context.get("risk_score", 0)
-                })
+                }, option=ORJSON_OPTIONS)
             )
             
             # Generate limited firewall rules (allow only essential services)
@@ -521,20 +643,20 @@ class AutomatedResponseService:
                     {"direction": "outbound", "action": "deny", "ports": "others"},
                     {"direction": "inbound", "action": "deny", "ports": "all"}
                 ],
-                "created_at": datetime.utcnow().isoformat()
+                "created_at": datetime.utcnow()
             }
             
-            # Store firewall rules
-            self.redis_client.setex(
+            pipe.setex(
                 f"firewall:{device.device_id}",
                 86400,
-                json.dumps(firewall_rules)
+                orjson.dumps(firewall_rules, option=ORJSON_OPTIONS)
             )
+            pipe.delete(DASHBOARD_CACHE_KEY)  # Cached dashboard shows the old device state
+            pipe.incr(device_details_version_key(device.device_id))
+            pipe.execute()
             
-            db.commit()
-            
-            # Send notification
-            await self.notification_service.send_notification({
+            # Notify with the next digest; the action doesn't depend on delivery
+            self.notification_service.queue_notification({
                 "type": "device_quarantined",
                 "device_id": device.device_id,
                 "device_name": device.device_name,
@@ -542,11 +664,11 @@ class AutomatedResponseService:
                 "severity": "high"
             })
             
-            logger.info(f"Successfully quarantined device {device.device_id}")
+            logger.info("Successfully quarantined device {}", device.device_id)
             return True
             
         except Exception as e:
-            logger.error(f"Error quarantining device: {e}")
+            logger.error("Error quarantining device: {}", e)
             return False
     
     async def _revoke_user_access(self, db: Session, event: SecurityEvent, 
@@ -565,32 +687,27 @@ class AutomatedResponseService:
             # Disable user account temporarily
             user.is_active = False
             
-            # Terminate all active sessions
-            active_sessions = db.query(UserSession).filter(
+            # Terminate all active sessions with a single UPDATE
+            db.query(UserSession).filter(
                 UserSession.user_id == user.id,
                 UserSession.is_active == True
-            ).all()
-            
-            for session in active_sessions:
-                session.is_active = False
+            ).update({"is_active": False}, synchronize_session=False)
             
             # Store revocation reason
             revocation_key = f"access_revoked:{user.id}"
             self.redis_client.setex(
                 revocation_key,
                 86400,  # 24 hours
-                json.dumps({
+                orjson.dumps({
                     "reason": f"Automated access revocation due to {event.event_type}",
                     "event_id": event.event_id,
-                    "timestamp": datetime.utcnow().isoformat(),
+                    "timestamp": datetime.utcnow(),
                     "risk_score": context.get("risk_score", 0)
-                })
+                }, option=ORJSON_OPTIONS)
             )
             
-            db.commit()
-            
-            # Send notification
-            await self.notification_service.send_notification({
+            # Notify with the next digest; the action doesn't depend on delivery
+            self.notification_service.queue_notification({
                 "type": "user_access_revoked",
                 "user_id": user.id,
                 "username": user.username,
@@ -598,30 +715,33 @@ class AutomatedResponseService:
                 "severity": "high"
             })
             
-            logger.info(f"Successfully revoked access for user {user.username}")
+            logger.info("Successfully revoked access for user {}", user.username)
             return True
             
         except Exception as e:
-            logger.error(f"Error revoking user access: {e}")
+            logger.error("Error revoking user access: {}", e)
             return False
     
     async def _alert_administrators(self, db: Session, event: SecurityEvent, 
                                   context: Dict[str, Any]) -> bool:
         """Send alert to administrators"""
         try:
-            # Get device info for context
+            # Get device and user info for context in a single query
             device_info = "Unknown device"
-            if event.device_id:
-                device = db.query(Device).filter(Device.id == event.device_id).first()
-                if device:
-                    device_info = f"{device.device_name} ({device.device_id})"
-            
-            # Get user info for context
             user_info = "No user associated"
-            if event.user_id:
-                user = db.query(User).filter(User.id == event.user_id).first()
-                if user:
-                    user_info = f"{user.full_name} ({user.username})"
+            if event.device_id or event.user_id:
+                context_row = db.query(
+                    Device.device_name, Device.device_id, User.full_name, User.username
+                ).select_from(SecurityEvent).outerjoin(
+                    Device, Device.id == SecurityEvent.device_id
+                ).outerjoin(
+                    User, User.id == SecurityEvent.user_id
+                ).filter(SecurityEvent.id == event.id).first()
+                
+                if context_row and context_row.device_id:
+                    device_info = f"{context_row.device_name} ({context_row.device_id})"
+                if context_row and context_row.username:
+                    user_info = f"{context_row.full_name} ({context_row.username})"
             
             alert_data = {
                 "type": "security_alert",
@@ -642,21 +762,45 @@ class AutomatedResponseService:
             success = await self.notification_service.send_notification(alert_data)
             
             if success:
-                logger.info(f"Successfully sent alert for event {event.event_id}")
+                logger.info("Successfully sent alert for event {}", event.event_id)
             else:
-                logger.error(f"Failed to send alert for event {event.event_id}")
+                logger.error("Failed to send alert for event {}", event.event_id)
             
             return success
             
         except Exception as e:
-            logger.error(f"Error sending administrator alert: {e}")
+            logger.error("Error sending administrator alert: {}", e)
             return False
 
 
+class TokenBucket:
+    """Token bucket rate limiter: holds up to capacity tokens, refilled at rate per second"""
+    
+    def __init__(self, capacity: float, rate: float):
+        self.capacity = capacity
+        self.rate = rate
+        self.tokens = capacity
+        self.last_refill = time.monotonic()
+    
+    def try_consume(self) -> bool:
+        """Take one token if available"""
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.last_refill) * self.rate)
+        self.last_refill = now
+        
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+
 class NotificationService:
     """Service for sending notifications via various channels"""
     
-    def __init__(self):
+    def __init__(self, redis_client=None, flush_interval: float = 2.0,
+                 dedup_window_sec: int = 60):
+        self.redis_client = redis_client
+        self.dedup_window_sec = dedup_window_sec
         self.channels = ["email", "slack", "sms"]  # Available notification channels
         self.admin_contacts = {
             "email": ["security@hospital.com", "admin@hospital.com"],
@@ -664,67 +808,170 @@ class NotificationService:
             "sms": ["+1234567890", "+0987654321"]
         }
         
+        # Per-channel outbound caps so a runaway detector can't exhaust quotas
+        self._buckets = {
+            "email": TokenBucket(capacity=30, rate=0.5),
+            "slack": TokenBucket(capacity=60, rate=1.0),
+            "sms": TokenBucket(capacity=5, rate=1 / 60)
+        }
+        
+        # Alerts waiting for the next digest, grouped by (type, severity) in arrival order,
+        # each with the future its sender awaits for the delivery outcome
+        self.flush_interval = flush_interval
+        self._pending = defaultdict(list)
+        self._flush_task = None  # Started on first use, once an event loop is running
+        
         logger.info("Notification Service initialized")
     
     async def send_notification(self, alert_data: Dict[str, Any]) -> bool:
-        """Send notification through configured channels"""
+        """Send an alert with the next digest and return whether any channel delivered it"""
+        return await self.queue_notification(alert_data)
+    
+    def queue_notification(self, alert_data: Dict[str, Any]) -> asyncio.Future:
+        """Queue an alert; alerts of the same type and severity are sent together as one digest.
+        The returned future resolves to whether the digest was delivered"""
+        delivered = asyncio.get_running_loop().create_future()
+        if self._recently_notified(alert_data):
+            # An identical alert already went out inside the dedup window
+            logger.debug("Suppressing duplicate notification: {}", alert_data.get("type"))
+            delivered.set_result(True)
+            return delivered
+        
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._flush_loop())
+        
+        self._pending[(alert_data.get("type"), alert_data.get("severity"))].append(
+            (iso_now_cached(), alert_data, delivered)
+        )
+        return delivered
+    
+    def _recently_notified(self, alert_data: Dict[str, Any]) -> bool:
+        """Check and record the alert's fingerprint, shared across replicas via Redis"""
+        if self.redis_client is None or self.dedup_window_sec <= 0:
+            return False
+        
+        target = alert_data.get("device_id") or alert_data.get("user_id") or alert_data.get("device", "")
+        # Every alert has type "security_alert", so distinct events on the same
+        # target are told apart by their event type
+        fingerprint = hashlib.blake2b(
+            f"{alert_data.get('type')}|{alert_data.get('event_type', '')}|{target}|"
+            f"{alert_data.get('severity', '')}".encode(),
+            digest_size=8
+        ).hexdigest()
+        
         try:
-            success_count = 0
-            total_channels = len(self.channels)
-            
-            # Send email notification
+            # SET NX only succeeds for the first alert with this fingerprint in the window
+            return self.redis_client.set(
+                f"notif:dedup:{fingerprint}", "1", nx=True, ex=self.dedup_window_sec
+            ) is None
+        except redis.RedisError as e:
+            # Prefer a duplicate alert over a dropped one
+            logger.warning("Notification dedup unavailable: {}", e)
+            return False
+    
+    async def flush(self) -> None:
+        """Send every pending alert group now"""
+        # Swap the groups out so alerts queued during sending wait for the next flush
+        pending, self._pending = self._pending, defaultdict(list)
+        for alerts in pending.values():
+            try:
+                success = await self._dispatch(self._build_digest(alerts))
+            except Exception as e:
+                logger.error("Error dispatching notification digest: {}", e)
+                success = False
+            for _, _, delivered in alerts:
+                if not delivered.done():
+                    delivered.set_result(success)
+    
+    async def _flush_loop(self):
+        """Coalesce alerts arriving within each flush interval"""
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                if self._pending:
+                    await self.flush()
+            except Exception as e:
+                logger.error("Error flushing notifications: {}", e)
+    
+    def _build_digest(self, alerts: List[Tuple[str, Dict[str, Any], asyncio.Future]]) -> Dict[str, Any]:
+        """Combine a group of queued alerts into a single notification"""
+        first_ts, first_alert, _ = alerts[0]
+        if len(alerts) == 1:
+            return first_alert
+        
+        samples = [alert.get("description", "Security Alert") for _, alert, _ in alerts[:3]]
+        digest = dict(first_alert)
+        digest.update({
+            "count": len(alerts),
+            "first_ts": first_ts,
+            "last_ts": alerts[-1][0],
+            "description": f"{len(alerts)} alerts: " + "; ".join(samples) + ("; ..." if len(alerts) > 3 else "")
+        })
+        return digest
+    
+    async def _dispatch(self, alert_data: Dict[str, Any]) -> bool:
+        """Send one notification through configured channels"""
+        try:
+            # Channels are independent, so send on all of them concurrently
+            tasks = []
             if "email" in self.channels:
-                email_success = await self._send_email_notification(alert_data)
-                if email_success:
-                    success_count += 1
-            
-            # Send Slack notification (simulated)
+                tasks.append(self._send_email_notification(alert_data))
             if "slack" in self.channels:
-                slack_success = await self._send_slack_notification(alert_data)
-                if slack_success:
-                    success_count += 1
-            
-            # Send SMS notification (simulated)
+                tasks.append(self._send_slack_notification(alert_data))
             if "sms" in self.channels:
-                sms_success = await self._send_sms_notification(alert_data)
-                if sms_success:
+                tasks.append(self._send_sms_notification(alert_data))
+            
+            results = await asyncio.gather(*tasks, return_exceptions=True)
+            success_count = 0
+            for result in results:
+                if isinstance(result, Exception):
+                    logger.error("Notification channel failed: {}", result)
+                elif result is True:
                     success_count += 1
             
             # Consider success if at least one channel worked
             return success_count > 0
             
         except Exception as e:
-            logger.error(f"Error sending notifications: {e}")
+            logger.error("Error sending notifications: {}", e)
             return False
     
     async def _send_email_notification(self, alert_data: Dict[str, Any]) -> bool:
         """Send email notification (simulated)"""
         try:
+            if not self._buckets["email"].try_consume():
+                logger.warning("Email notification rate limited: {}", alert_data['type'])
+                return False
+            
             # In a real implementation, this would use SMTP to send emails
-            logger.info(f"EMAIL NOTIFICATION: {alert_data['type']} - {alert_data.get('description', 'Security Alert')}")
-            logger.info(f"Recipients: {self.admin_contacts['email']}")
+            logger.info("EMAIL NOTIFICATION: {} - {}", alert_data['type'], alert_data.get('description', 'Security Alert'))
+            logger.info("Recipients: {}", self.admin_contacts['email'])
             
             # Simulate email sending delay
             await asyncio.sleep(0.1)
             return True
             
         except Exception as e:
-            logger.error(f"Error sending email notification: {e}")
+            logger.error("Error sending email notification: {}", e)
             return False
     
     async def _send_slack_notification(self, alert_data: Dict[str, Any]) -> bool:
         """Send Slack notification (simulated)"""
         try:
+            if not self._buckets["slack"].try_consume():
+                logger.warning("Slack notification rate limited: {}", alert_data['type'])
+                return False
+            
             # In a real implementation, this would use Slack API
-            logger.info(f"SLACK NOTIFICATION: {alert_data['type']} - {alert_data.get('description', 'Security Alert')}")
-            logger.info(f"Channels: {self.admin_contacts['slack']}")
+            logger.info("SLACK NOTIFICATION: {} - {}", alert_data['type'], alert_data.get('description', 'Security Alert'))
+            logger.info("Channels: {}", self.admin_contacts['slack'])
             
             # Simulate Slack API delay
             await asyncio.sleep(0.1)
             return True
             
         except Exception as e:
-            logger.error(f"Error sending Slack notification: {e}")
+            logger.error("Error sending Slack notification: {}", e)
             return False
     
     async def _send_sms_notification(self, alert_data: Dict[str, Any]) -> bool:
@@ -735,15 +982,18 @@ class NotificationService:
             
             # Only send SMS for high/critical alerts to avoid spam
             if severity in ['high', 'critical']:
-                logger.info(f"SMS NOTIFICATION: {alert_data['type']} - {alert_data.get('description', 'Security Alert')}")
-                logger.info(f"Recipients: {self.admin_contacts['sms']}")
+                if not self._buckets["sms"].try_consume():
+                    logger.warning("SMS notification rate limited: {}", alert_data['type'])
+                    return False
+                logger.info("SMS NOTIFICATION: {} - {}", alert_data['type'], alert_data.get('description', 'Security Alert'))
+                logger.info("Recipients: {}", self.admin_contacts['sms'])
             
             # Simulate SMS service delay
             await asyncio.sleep(0.1)
             return True
             
         except Exception as e:
-            logger.error(f"Error sending SMS notification: {e}")
+            logger.error("Error sending SMS notification: {}", e)
             return False
 
 
@@ -751,7 +1001,7 @@ class ResponseOrchestrator:
     """Main orchestrator for coordinating incident response and automated actions"""
     
     def __init__(self, redis_host: str = "localhost", redis_port: int = 6379):
-        self.redis_client = redis.Redis(host=redis_host, port=redis_port, decode_responses=True)
+        self.redis_client = get_redis_client(redis_host, redis_port)
         
         # Initialize services
         self.incident_service = IncidentResponseService(self.redis_client)
@@ -780,16 +1030,26 @@ class ResponseOrchestrator:
                 correlations
             )
             
+            # Incident bookkeeping is blocking I/O, so it runs on the default executor
+            # and leaves the event loop free for other events' responses. Sessions and
+            # ORM objects stay on this thread; workers get the event's primary key
+            loop = asyncio.get_running_loop()
+            
             if should_create_incident:
-                incident = self.incident_service.create_incident(db, event, correlations)
+                incident = await loop.run_in_executor(
+                    None, self._create_incident_for_event, event.id, correlations
+                )
                 response_summary["incident_created"] = True
                 response_summary["incident_id"] = incident["incident_id"]
             
-            # Evaluate and execute automated response actions
+            # Evaluate and execute automated response actions; evaluation is a table
+            # lookup, cheaper than a thread hand-off, so it stays on the loop
             recommended_actions = self.automated_response.evaluate_response_actions(
                 db, event, analysis_results
             )
             
+            # Actions share the request's session, so they run one at a time; a
+            # failing action's rollback must not discard another's uncommitted rows
             for action in recommended_actions:
                 try:
                     success = await self.automated_response.execute_response_action(
@@ -811,7 +1071,9 @@ class ResponseOrchestrator:
                 if response_summary["actions_failed"]:
                     action_summary += f", Failed actions: {response_summary['actions_failed']}"
                 
-                self.incident_service.update_incident(
+                await loop.run_in_executor(
+                    None,
+                    self.incident_service.update_incident,
                     response_summary["incident_id"],
                     {
                         "response_actions": response_summary["actions_executed"],
@@ -829,6 +1091,15 @@ class ResponseOrchestrator:
             logger.error(f"Error processing security event: {e}")
             return response_summary
     
+    def _create_incident_for_event(self, event_pk: int,
+                                   correlations: Optional[List[Dict]]) -> Dict[str, Any]:
+        """Create an incident for a security event, in a session owned by the calling thread"""
+        with db_manager.get_session() as db:
+            event = db.query(SecurityEvent).filter(SecurityEvent.id == event_pk).first()
+            if event is None:
+                raise ValueError(f"Security event not found: {event_pk}")
+            return self.incident_service.create_incident(db, event, correlations)
+    
     def get_response_status(self, event_id: str) -> Dict[str, Any]:
         """Get response status for a specific event"""
         try:
@@ -837,7 +1108,7 @@ class ResponseOrchestrator:
             status_data = self.redis_client.get(status_key)
             
             if status_data:
-                return json.loads(status_data)
+                return orjson.loads(status_data)
             
             return {"error": "Response status not found"}
             
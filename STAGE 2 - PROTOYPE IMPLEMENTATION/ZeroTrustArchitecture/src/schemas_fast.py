@@ -0,0 +1,100 @@
+"""
+Lightweight response schemas for Zero Trust Architecture
+Outbound data is built from rows validated on write, so plain TypedDicts are used
+instead of Pydantic models
+"""
+
+from datetime import datetime
+from typing import Optional
+
+# Pydantic (and so FastAPI response_model) needs typing_extensions.TypedDict before Python 3.12
+from typing_extensions import TypedDict
+
+from .models import User, Device, SecurityEvent
+
+
+class UserResponse(TypedDict):
+    id: int
+    username: str
+    email: str
+    full_name: str
+    department: str
+    role: str
+    is_active: bool
+    is_mfa_enabled: bool
+    created_at: datetime
+
+
+class DeviceResponse(TypedDict):
+    id: int
+    device_id: str
+    device_name: str
+    device_type: str
+    mac_address: str
+    ip_address: Optional[str]
+    is_compliant: bool
+    is_quarantined: bool
+    trust_score: float
+    last_seen: Optional[datetime]
+
+
+class SecurityEventResponse(TypedDict):
+    id: int
+    event_id: str
+    event_type: str
+    threat_level: str
+    confidence_score: float
+    description: str
+    is_resolved: bool
+    created_at: datetime
+
+
+class Token(TypedDict):
+    access_token: str
+    token_type: str
+    expires_in: int
+
+
+def user_response(user: User) -> UserResponse:
+    """Build a user response from an ORM row"""
+    return UserResponse(
+        id=user.id,
+        username=user.username,
+        email=user.email,
+        full_name=user.full_name,
+        department=user.department,
+        role=user.role,
+        is_active=user.is_active,
+        is_mfa_enabled=user.is_mfa_enabled,
+        created_at=user.created_at
+    )
+
+
+def device_response(device: Device) -> DeviceResponse:
+    """Build a device response from an ORM row"""
+    return DeviceResponse(
+        id=device.id,
+        device_id=device.device_id,
+        device_name=device.device_name,
+        device_type=device.device_type,
+        mac_address=device.mac_address,
+        ip_address=device.ip_address,
+        is_compliant=device.is_compliant,
+        is_quarantined=device.is_quarantined,
+        trust_score=device.trust_score,
+        last_seen=device.last_seen
+    )
+
+
+def security_event_response(event: SecurityEvent) -> SecurityEventResponse:
+    """Build a security event response from an ORM row"""
+    return SecurityEventResponse(
+        id=event.id,
+        event_id=event.event_id,
+        event_type=event.event_type,
+        threat_level=event.threat_level,
+        confidence_score=event.confidence_score,
+        description=event.description,
+        is_resolved=event.is_resolved,
+        created_at=event.created_at
+    )
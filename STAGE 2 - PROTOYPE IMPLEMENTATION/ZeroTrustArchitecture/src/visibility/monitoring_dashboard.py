@@ -3,8 +3,13 @@ Visibility System for Zero Trust Architecture
 Provides centralized logging, monitoring, and dashboard capabilities
 """
 
-import json
+import copy
+import heapq
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
 import asyncio
+import orjson
 from datetime import datetime, timedelta
 from typing import Dict, Any, List, Optional
 from dataclasses import dataclass, asdict
@@ -13,21 +18,41 @@ import plotly.graph_objs as go
 import plotly.express as px
 from plotly.utils import PlotlyJSONEncoder
 import streamlit as st
-from sqlalchemy.orm import Session
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session, joinedload, load_only
+from cachetools import TTLCache
 from loguru import logger
 import redis
 
 from ..models import (
     Device, SecurityEvent, User, DevicePosture, 
-    ResponseActionModel, ThreatLevel
+    ResponseActionModel, ThreatLevel, ResponseStatus
 )
-from ..database import db_manager
+from ..database import DASHBOARD_CACHE_KEY, db_manager, device_details_version_key, get_redis_client
 from ..endpoint_monitoring.monitoring_service import EndpointMonitoringService
 from ..central_analysis.analysis_engine import CentralAnalysisEngine
 from ..response.response_system import ResponseOrchestrator
 from ..device_protection.protection_service import DeviceProtectionOrchestrator
 
 
+# Naive UTC datetimes are written as RFC 3339 with a Z suffix
+ORJSON_OPTIONS = orjson.OPT_NAIVE_UTC | orjson.OPT_UTC_Z
+
+# Types orjson doesn't know natively (Plotly and pandas objects) fall back to Plotly's encoder
+_PLOTLY_ENCODER = PlotlyJSONEncoder()
+
+
+def dumps_dashboard(obj: Any) -> bytes:
+    """Serialize dashboard payloads, including chart dicts that may hold numpy arrays"""
+    return orjson.dumps(
+        obj,
+        default=_PLOTLY_ENCODER.default,
+        option=ORJSON_OPTIONS | orjson.OPT_SERIALIZE_NUMPY
+    )
+
+# Same window as EndpointMonitoringService.HEARTBEAT_TIMEOUT
+HEARTBEAT_TIMEOUT = 300  # seconds
+
 @dataclass
 class DashboardMetrics:
     """Container for dashboard metrics"""
@@ -58,27 +83,14 @@ class CentralizedLoggingService:
         """Log a security event"""
         try:
             log_entry = {
-                "timestamp": datetime.utcnow().isoformat(),
+                "timestamp": datetime.utcnow(),
                 "log_type": "security_event",
                 "severity": event_data.get("threat_level", "low"),
                 "source": "security_engine",
                 "data": event_data
             }
             
-            # Store in Redis with timestamp-based key
-            log_key = f"log:security:{datetime.utcnow().timestamp()}"
-            self.redis_client.setex(
-                log_key,
-                self.log_retention_hours * 3600,
-                json.dumps(log_entry)
-            )
-            
-            # Also add to a sorted set for easy querying
-            self.redis_client.zadd(
-                "logs:security:index",
-                {log_key: datetime.utcnow().timestamp()}
-            )
-            
+            self._store_log("security", log_entry)
             return True
             
         except Exception as e:
@@ -90,7 +102,7 @@ class CentralizedLoggingService:
         """Log a system event"""
         try:
             log_entry = {
-                "timestamp": datetime.utcnow().isoformat(),
+                "timestamp": datetime.utcnow(),
                 "log_type": "system_event",
                 "component": component,
                 "event_type": event_type,
@@ -99,18 +111,7 @@ class CentralizedLoggingService:
                 "data": data
             }
             
-            log_key = f"log:system:{datetime.utcnow().timestamp()}"
-            self.redis_client.setex(
-                log_key,
-                self.log_retention_hours * 3600,
-                json.dumps(log_entry)
-            )
-            
-            self.redis_client.zadd(
-                "logs:system:index",
-                {log_key: datetime.utcnow().timestamp()}
-            )
-            
+            self._store_log("system", log_entry)
             return True
             
         except Exception as e:
@@ -122,7 +123,7 @@ class CentralizedLoggingService:
         """Log user activity"""
         try:
             log_entry = {
-                "timestamp": datetime.utcnow().isoformat(),
+                "timestamp": datetime.utcnow(),
                 "log_type": "user_activity",
                 "user_id": user_id,
                 "device_id": device_id,
@@ -132,59 +133,107 @@ class CentralizedLoggingService:
                 "details": details
             }
             
-            log_key = f"log:user:{datetime.utcnow().timestamp()}"
-            self.redis_client.setex(
-                log_key,
-                self.log_retention_hours * 3600,
-                json.dumps(log_entry)
-            )
-            
-            self.redis_client.zadd(
-                "logs:user:index",
-                {log_key: datetime.utcnow().timestamp()}
-            )
-            
+            self._store_log("user", log_entry)
             return True
             
         except Exception as e:
             logger.error(f"Error logging user activity: {e}")
             return False
     
+    def _store_log(self, log_type: str, log_entry: Dict[str, Any]) -> None:
+        """Append a log entry to its stream, trimming entries past retention"""
+        pipe = self.redis_client.pipeline(transaction=False)
+        
+        # Stream IDs are unique epoch-millisecond IDs assigned by the server,
+        # so MINID trims by age in the same XADD
+        now_ns = time.time_ns()
+        retention_start_ms = now_ns // 1_000_000 - self.log_retention_hours * 3_600_000
+        # Severity and the searchable text are also stored as their own fields
+        # so queries can filter on them without decoding the payload
+        pipe.xadd(
+            f"logs:{log_type}:stream",
+            {
+                "data": orjson.dumps(log_entry, option=ORJSON_OPTIONS),
+                "severity": str(log_entry.get("severity", "info")),
+                "text": self._search_text(log_entry)
+            },
+            minid=retention_start_ms,
+            approximate=True
+        )
+        
+        # Maintain hourly counters so statistics don't have to read the logs back
+        bucket = self._stats_bucket(now_ns // 1_000_000_000)
+        bucket_ttl = self.log_retention_hours * 3600 + 3600
+        for dimension, value in (("by_type", log_entry.get("log_type", "unknown")),
+                                 ("by_severity", log_entry.get("severity", "info"))):
+            stats_key = f"logstats:{dimension}:{bucket}"
+            pipe.hincrby(stats_key, value, 1)
+            pipe.expire(stats_key, bucket_ttl)
+        
+        pipe.execute()
+    
+    @staticmethod
+    def _search_text(log_entry: Dict[str, Any]) -> str:
+        """Casefolded human-readable fields and device/user IDs of a log entry, matched by text search"""
+        data = log_entry.get("data") or {}
+        parts = (
+            log_entry.get("component"),
+            log_entry.get("event_type"),
+            log_entry.get("activity"),
+            log_entry.get("device_id"),
+            log_entry.get("user_id"),
+            data.get("event_type"),
+            data.get("description"),
+            data.get("message"),
+            data.get("device_id"),
+            data.get("user_id")
+        )
+        return " ".join(str(part) for part in parts if part).casefold()
+    
+    @staticmethod
+    def _stats_bucket(epoch_seconds: float) -> str:
+        """Hourly UTC bucket suffix for log statistics keys"""
+        return time.strftime("%Y%m%d%H", time.gmtime(epoch_seconds))
+    
     def query_logs(self, log_type: str = "all", severity: str = None,
-                  time_range_hours: int = 24, limit: int = 100) -> List[Dict[str, Any]]:
+                  time_range_hours: int = 24, limit: int = 100,
+                  search_term: str = None) -> List[Dict[str, Any]]:
         """Query logs with filters"""
         try:
             logs = []
-            current_time = datetime.utcnow().timestamp()
-            start_time = current_time - (time_range_hours * 3600)
+            needle = search_term.casefold() if search_term else None
+            # Epoch time from time.time_ns; utcnow().timestamp() is skewed on non-UTC hosts
+            start_ms = time.time_ns() // 1_000_000 - time_range_hours * 3_600_000
             
-            # Determine which log indices to query
-            indices_to_query = []
+            # Determine which log streams to query
+            streams_to_query = []
             if log_type == "all":
-                indices_to_query = ["logs:security:index", "logs:system:index", "logs:user:index"]
+                streams_to_query = ["logs:security:stream", "logs:system:stream", "logs:user:stream"]
             else:
-                indices_to_query = [f"logs:{log_type}:index"]
-            
-            for index_key in indices_to_query:
-                if self.redis_client.exists(index_key):
-                    # Get log keys within time range
-                    log_keys = self.redis_client.zrangebyscore(
-                        index_key, start_time, current_time, withscores=False
-                    )
+                streams_to_query = [f"logs:{log_type}:stream"]
+            
+            for stream_key in streams_to_query:
+                # Read every entry within the time range in one round-trip
+                entries = self.redis_client.xrange(stream_key, min=start_ms, max="+")
+                
+                for _, fields in entries:
+                    # Filter on the stored fields before decoding, so rejected
+                    # entries are never parsed
+                    if severity is not None and fields.get("severity", severity) != severity:
+                        continue
+                    # Entries written before the text field existed fall back to
+                    # scanning the whole payload
+                    if needle is not None and needle not in fields.get("text", fields["data"]).casefold():
+                        continue
                     
-                    # Retrieve log entries
-                    for log_key in log_keys:
-                        log_data = self.redis_client.get(log_key)
-                        if log_data:
-                            log_entry = json.loads(log_data)
-                            
-                            # Apply severity filter if specified
-                            if severity is None or log_entry.get("severity") == severity:
-                                logs.append(log_entry)
-            
-            # Sort by timestamp (newest first) and limit results
-            logs.sort(key=lambda x: x.get("timestamp", ""), reverse=True)
-            return logs[:limit]
+                    log_entry = orjson.loads(fields["data"])
+                    
+                    # Entries written before severity became a field are checked after decoding
+                    if severity is None or log_entry.get("severity") == severity:
+                        logs.append(log_entry)
+            
+            # Newest first, selecting only the top entries instead of sorting everything
+            return heapq.nlargest(limit, logs, key=lambda x: x.get("timestamp", ""))
             
         except Exception as e:
             logger.error(f"Error querying logs: {e}")
@@ -200,19 +249,36 @@ class CentralizedLoggingService:
                 "recent_activity": []
             }
             
-            logs = self.query_logs("all", time_range_hours=time_range_hours, limit=1000)
-            stats["total_logs"] = len(logs)
-            
-            # Count by type and severity
-            for log_entry in logs:
-                log_type = log_entry.get("log_type", "unknown")
-                severity = log_entry.get("severity", "info")
-                
-                stats["logs_by_type"][log_type] = stats["logs_by_type"].get(log_type, 0) + 1
-                stats["logs_by_severity"][severity] = stats["logs_by_severity"].get(severity, 0) + 1
-            
-            # Get recent activity (last 10 entries)
-            stats["recent_activity"] = logs[:10]
+            # Sum the hourly counters covering the window (the oldest bucket is whole,
+            # so counts can include up to an hour before the window) and fetch the
+            # newest entries of each stream, all in one round-trip
+            now = time.time()
+            buckets = [self._stats_bucket(now - hour * 3600) for hour in range(time_range_hours + 1)]
+            start_ms = int(now * 1000) - time_range_hours * 3_600_000
+            
+            pipe = self.redis_client.pipeline(transaction=False)
+            for dimension in ("by_type", "by_severity"):
+                for bucket in buckets:
+                    pipe.hgetall(f"logstats:{dimension}:{bucket}")
+            for log_type in ("security", "system", "user"):
+                pipe.xrevrange(f"logs:{log_type}:stream", max="+", min=start_ms, count=10)
+            results = pipe.execute()
+            
+            for dimension, counters in (("logs_by_type", results[:len(buckets)]),
+                                        ("logs_by_severity", results[len(buckets):2 * len(buckets)])):
+                totals = stats[dimension]
+                for counts in counters:
+                    for value, count in counts.items():
+                        totals[value] = totals.get(value, 0) + int(count)
+            stats["total_logs"] = sum(stats["logs_by_type"].values())
+            
+            # Get recent activity (last 10 entries across all streams)
+            recent = [
+                orjson.loads(fields["data"])
+                for entries in results[2 * len(buckets):]
+                for _, fields in entries
+            ]
+            stats["recent_activity"] = heapq.nlargest(10, recent, key=lambda x: x.get("timestamp", ""))
             
             return stats
             
@@ -224,84 +290,34 @@ class CentralizedLoggingService:
 class MetricsCollector:
     """Service for collecting and aggregating system metrics"""
     
+    METRICS_CACHE_KEY = "metrics:current"
+    METRICS_CACHE_TTL = 5  # seconds
+    
+    # Collectors are created per request, so the node-local cache lives on the class;
+    # request handlers and the refresher's executor threads share it under the lock
+    _local_metrics = TTLCache(maxsize=1, ttl=2)
+    _local_metrics_lock = threading.Lock()
+    
     def __init__(self, redis_client, db_session):
         self.redis_client = redis_client
         self.db = db_session
+        self.max_snapshots = 1000
         
         logger.info("Metrics Collector initialized")
     
     def collect_current_metrics(self) -> DashboardMetrics:
-        """Collect current system metrics"""
+        """Collect current system metrics, shared for a few seconds across dashboard viewers"""
+        with self._local_metrics_lock:
+            metrics = self._local_metrics.get("current")
+        if metrics is not None:
+            return metrics
+        
         try:
-            # Get device statistics
-            total_devices = self.db.query(Device).count()
-            compliant_devices = self.db.query(Device).filter(Device.is_compliant == True).count()
-            quarantined_devices = self.db.query(Device).filter(Device.is_quarantined == True).count()
-            
-            # Get online/offline device count from Redis heartbeats
-            online_devices = 0
-            offline_devices = 0
-            device_ids = [d.device_id for d in self.db.query(Device).all()]
-            
-            for device_id in device_ids:
-                heartbeat_key = f"heartbeat:{device_id}"
-                if self.redis_client.exists(heartbeat_key):
-                    online_devices += 1
-                else:
-                    offline_devices += 1
-            
-            # Get security event statistics (last 24 hours)
-            recent_threshold = datetime.utcnow() - timedelta(hours=24)
-            security_events_24h = self.db.query(SecurityEvent).filter(
-                SecurityEvent.created_at >= recent_threshold
-            ).count()
-            
-            critical_events = self.db.query(SecurityEvent).filter(
-                SecurityEvent.threat_level == ThreatLevel.CRITICAL,
-                SecurityEvent.is_resolved == False
-            ).count()
-            
-            # Calculate average trust score
-            devices_with_scores = self.db.query(Device).filter(Device.trust_score > 0).all()
-            avg_trust_score = 0.0
-            if devices_with_scores:
-                avg_trust_score = sum(d.trust_score for d in devices_with_scores) / len(devices_with_scores)
-            
-            # Calculate compliance rate
-            compliance_rate = (compliant_devices / total_devices * 100) if total_devices > 0 else 0
-            
-            # Get threat level distribution
-            threat_levels = self.db.query(SecurityEvent.threat_level).filter(
-                SecurityEvent.created_at >= recent_threshold
-            ).all()
-            
-            threat_level_distribution = {}
-            for level in [ThreatLevel.LOW, ThreatLevel.MEDIUM, ThreatLevel.HIGH, ThreatLevel.CRITICAL]:
-                count = sum(1 for t in threat_levels if t[0] == level)
-                threat_level_distribution[level.value] = count
-            
-            # Get device type distribution
-            device_types = self.db.query(Device.device_type).all()
-            device_type_distribution = {}
-            for device_type in device_types:
-                dtype = device_type[0]
-                device_type_distribution[dtype] = device_type_distribution.get(dtype, 0) + 1
-            
-            return DashboardMetrics(
-                timestamp=datetime.utcnow().isoformat(),
-                total_devices=total_devices,
-                online_devices=online_devices,
-                offline_devices=offline_devices,
-                compliant_devices=compliant_devices,
-                quarantined_devices=quarantined_devices,
-                security_events_24h=security_events_24h,
-                critical_events=critical_events,
-                average_trust_score=avg_trust_score,
-                compliance_rate=compliance_rate,
-                threat_level_distribution=threat_level_distribution,
-                device_type_distribution=device_type_distribution
-            )
-            
+            cached = self.redis_client.get(self.METRICS_CACHE_KEY)
+            if cached:
+                metrics = DashboardMetrics(**orjson.loads(cached))
+            else:
+                return self.refresh_current_metrics()
         except Exception as e:
             logger.error(f"Error collecting metrics: {e}")
             return DashboardMetrics(
@@ -312,34 +328,102 @@ class MetricsCollector:
                 average_trust_score=0.0, compliance_rate=0.0,
                 threat_level_distribution={}, device_type_distribution={}
             )
+        
+        with self._local_metrics_lock:
+            self._local_metrics["current"] = metrics
+        return metrics
+    
+    def refresh_current_metrics(self, ttl: Optional[int] = None) -> DashboardMetrics:
+        """Recompute current metrics and publish them to the shared summary cache"""
+        metrics = self._compute_current_metrics()
+        self.redis_client.set(
+            self.METRICS_CACHE_KEY,
+            orjson.dumps(asdict(metrics), option=ORJSON_OPTIONS),
+            ex=ttl or self.METRICS_CACHE_TTL
+        )
+        with self._local_metrics_lock:
+            self._local_metrics["current"] = metrics
+        return metrics
+    
+    def _compute_current_metrics(self) -> DashboardMetrics:
+        """Compute current system metrics from the database and Redis"""
+        now = datetime.utcnow()
+        
+        # Every device metric, including the type distribution, from one pass over
+        # devices: per-type filtered aggregates that are summed up below
+        device_rows = self.db.query(
+            Device.device_type,
+            func.count(Device.id),
+            func.count(Device.id).filter(Device.is_compliant == True),
+            func.count(Device.id).filter(Device.is_quarantined == True),
+            func.sum(Device.trust_score).filter(Device.trust_score > 0),
+            func.count(Device.id).filter(Device.trust_score > 0)
+        ).group_by(Device.device_type).all()
+        
+        device_type_distribution = {row[0]: row[1] for row in device_rows}
+        total_devices = sum(row[1] for row in device_rows)
+        compliant_devices = sum(row[2] for row in device_rows)
+        quarantined_devices = sum(row[3] for row in device_rows)
+        scored_devices = sum(row[5] for row in device_rows)
+        avg_trust_score = (
+            sum(row[4] or 0.0 for row in device_rows) / scored_devices if scored_devices else 0.0
+        )
+        
+        # Count devices with a heartbeat inside the timeout window from the
+        # online set the monitoring service keeps, without enumerating devices
+        online_devices = min(self.redis_client.zcount(
+            "online_devices", time.time() - HEARTBEAT_TIMEOUT, "+inf"
+        ), total_devices)
+        offline_devices = total_devices - online_devices
+        
+        # Security events by threat level over the last 24 hours, counted in the database
+        recent_threshold = now - timedelta(hours=24)
+        threat_level_counts = dict(self.db.query(
+            SecurityEvent.threat_level, func.count(SecurityEvent.id)
+        ).filter(
+            SecurityEvent.created_at >= recent_threshold
+        ).group_by(SecurityEvent.threat_level).all())
+        security_events_24h = sum(threat_level_counts.values())
+        
+        critical_events = self.db.query(func.count(SecurityEvent.id)).filter(
+            SecurityEvent.threat_level == ThreatLevel.CRITICAL,
+            SecurityEvent.is_resolved == False
+        ).scalar()
+        
+        # Calculate compliance rate
+        compliance_rate = (compliant_devices / total_devices * 100) if total_devices > 0 else 0
+        
+        threat_level_distribution = {
+            level.value: threat_level_counts.get(level.value, 0)
+            for level in [ThreatLevel.LOW, ThreatLevel.MEDIUM, ThreatLevel.HIGH, ThreatLevel.CRITICAL]
+        }
+        
+        return DashboardMetrics(
+            timestamp=now.isoformat(),
+            total_devices=total_devices,
+            online_devices=online_devices,
+            offline_devices=offline_devices,
+            compliant_devices=compliant_devices,
+            quarantined_devices=quarantined_devices,
+            security_events_24h=security_events_24h,
+            critical_events=critical_events,
+            average_trust_score=avg_trust_score,
+            compliance_rate=compliance_rate,
+            threat_level_distribution=threat_level_distribution,
+            device_type_distribution=device_type_distribution
+        )
     
     def store_metrics_snapshot(self, metrics: DashboardMetrics) -> bool:
         """Store metrics snapshot for historical analysis"""
         try:
-            # Store current metrics
-            metrics_key = f"metrics:snapshot:{datetime.utcnow().timestamp()}"
-            self.redis_client.setex(
-                metrics_key,
-                86400 * 7,  # 7 days retention
-                json.dumps(asdict(metrics))
-            )
-            
-            # Add to time series index
-            self.redis_client.zadd(
-                "metrics:index",
-                {metrics_key: datetime.utcnow().timestamp()}
+            # Append to the metrics stream, keeping roughly the newest snapshots
+            self.redis_client.xadd(
+                "metrics:stream",
+                {"data": orjson.dumps(asdict(metrics), option=ORJSON_OPTIONS)},
+                maxlen=self.max_snapshots,
+                approximate=True
             )
             
-            # Keep only last 1000 snapshots
-            total_snapshots = self.redis_client.zcard("metrics:index")
-            if total_snapshots > 1000:
-                oldest_keys = self.redis_client.zrange("metrics:index", 0, total_snapshots - 1000)
-                if oldest_keys:
-                    # Remove old snapshots
-                    for key in oldest_keys:
-                        self.redis_client.delete(key)
-                    self.redis_client.zrem("metrics:index", *oldest_keys)
-            
             return True
             
         except Exception as e:
@@ -349,29 +433,109 @@ class MetricsCollector:
     def get_historical_metrics(self, hours_back: int = 24) -> List[Dict[str, Any]]:
         """Get historical metrics for trend analysis"""
         try:
-            current_time = datetime.utcnow().timestamp()
-            start_time = current_time - (hours_back * 3600)
+            start_ms = time.time_ns() // 1_000_000 - hours_back * 3_600_000
             
-            # Get metric keys within time range
-            metric_keys = self.redis_client.zrangebyscore(
-                "metrics:index", start_time, current_time
-            )
-            
-            historical_metrics = []
-            for key in metric_keys:
-                metric_data = self.redis_client.get(key)
-                if metric_data:
-                    historical_metrics.append(json.loads(metric_data))
+            # Stream entries come back in insertion (time) order
+            entries = self.redis_client.xrange("metrics:stream", min=start_ms, max="+")
             
-            # Sort by timestamp
-            historical_metrics.sort(key=lambda x: x.get("timestamp", ""))
-            return historical_metrics
+            return [orjson.loads(fields["data"]) for _, fields in entries]
             
         except Exception as e:
             logger.error(f"Error getting historical metrics: {e}")
             return []
 
 
+def _figure_template(fig: go.Figure) -> Dict[str, Any]:
+    """Validate a figure once and keep its plain-dict form as a template"""
+    return fig.to_plotly_json()
+
+
+def _render_template(template: Dict[str, Any], *trace_data: Dict[str, Any]) -> Dict[str, Any]:
+    """Fill a copy of a template's traces with fresh data; each chart gets its own layout"""
+    return {
+        "data": [{**copy.deepcopy(trace), **data} for trace, data in zip(template["data"], trace_data)],
+        "layout": copy.deepcopy(template["layout"])
+    }
+
+
+def _empty_chart(template: Dict[str, Any]) -> Dict[str, Any]:
+    """A chart with the template's layout but no traces"""
+    return {"data": [], "layout": copy.deepcopy(template["layout"])}
+
+
+# Chart templates are built and validated once at import; only trace data changes per render
+_DEVICE_STATUS_TEMPLATE = _figure_template(go.Figure(
+    data=[go.Pie(
+        labels=['Online', 'Offline', 'Quarantined'],
+        hole=0.4,
+        marker=dict(colors=['#28a745', '#dc3545', '#ffc107']),
+        textposition='inside',
+        textinfo='percent+label'
+    )],
+    layout=dict(
+        title="Device Status Distribution",
+        annotations=[dict(text='Devices', x=0.5, y=0.5, font_size=20, showarrow=False)]
+    )
+))
+
+_COMPLIANCE_GAUGE_TEMPLATE = _figure_template(go.Figure(go.Indicator(
+    mode="gauge+number+delta",
+    domain={'x': [0, 1], 'y': [0, 1]},
+    title={'text': "Compliance Rate (%)"},
+    delta={'reference': 80, 'increasing': {'color': "green"}, 'decreasing': {'color': "red"}},
+    gauge={
+        'axis': {'range': [None, 100]},
+        'bar': {'color': "darkblue"},
+        'steps': [
+            {'range': [0, 50], 'color': "lightgray"},
+            {'range': [50, 80], 'color': "gray"}
+        ],
+        'threshold': {
+            'line': {'color': "red", 'width': 4},
+            'thickness': 0.75,
+            'value': 90
+        }
+    }
+)))
+
+THREAT_LEVEL_COLORS = ['green', 'yellow', 'orange', 'red']
+
+_THREAT_LEVEL_TEMPLATE = _figure_template(go.Figure(
+    data=[go.Bar()],
+    layout=dict(
+        title="Security Events by Threat Level (24h)",
+        xaxis_title="Threat Level",
+        yaxis_title="Number of Events"
+    )
+))
+
+_TRUST_SCORE_TEMPLATE = _figure_template(go.Figure(
+    data=[go.Histogram(
+        nbinsx=20,
+        marker=dict(color='skyblue', line=dict(color='black', width=1))
+    )],
+    layout=dict(
+        title="Trust Score Distribution",
+        xaxis_title="Trust Score",
+        yaxis_title="Number of Devices",
+        bargap=0.1
+    )
+))
+
+_TIMELINE_TEMPLATE = _figure_template(go.Figure(
+    data=[
+        go.Scatter(mode='lines+markers', name='Compliance Rate (%)', line=dict(color='blue')),
+        go.Scatter(mode='lines+markers', name='Avg Trust Score (%)', line=dict(color='green'))
+    ],
+    layout=dict(
+        title="Security Metrics Timeline",
+        xaxis_title="Time",
+        yaxis_title="Percentage",
+        legend=dict(x=0, y=1)
+    )
+))
+
+
 class DashboardGenerator:
     """Service for generating dashboard visualizations"""
     
@@ -380,102 +544,41 @@ class DashboardGenerator:
     
     def create_device_status_chart(self, metrics: DashboardMetrics) -> Dict[str, Any]:
         """Create device status pie chart"""
-        labels = ['Online', 'Offline', 'Quarantined']
         values = [
             metrics.online_devices - metrics.quarantined_devices,  # Online and not quarantined
             metrics.offline_devices,
             metrics.quarantined_devices
         ]
-        colors = ['#28a745', '#dc3545', '#ffc107']
         
-        fig = go.Figure(data=[go.Pie(
-            labels=labels,
-            values=values,
-            hole=0.4,
-            marker=dict(colors=colors)
-        )])
-        
-        fig.update_traces(textposition='inside', textinfo='percent+label')
-        fig.update_layout(
-            title="Device Status Distribution",
-            annotations=[dict(text='Devices', x=0.5, y=0.5, font_size=20, showarrow=False)]
-        )
-        
-        return json.loads(json.dumps(fig, cls=PlotlyJSONEncoder))
+        return _render_template(_DEVICE_STATUS_TEMPLATE, {"values": values})
     
     def create_compliance_gauge(self, compliance_rate: float) -> Dict[str, Any]:
         """Create compliance rate gauge"""
-        fig = go.Figure(go.Indicator(
-            mode="gauge+number+delta",
-            value=compliance_rate,
-            domain={'x': [0, 1], 'y': [0, 1]},
-            title={'text': "Compliance Rate (%)"},
-            delta={'reference': 80, 'increasing': {'color': "green"}, 'decreasing': {'color': "red"}},
-            gauge={
-                'axis': {'range': [None, 100]},
-                'bar': {'color': "darkblue"},
-                'steps': [
-                    {'range': [0, 50], 'color': "lightgray"},
-                    {'range': [50, 80], 'color': "gray"}
-                ],
-                'threshold': {
-                    'line': {'color': "red", 'width': 4},
-                    'thickness': 0.75,
-                    'value': 90
-                }
-            }
-        ))
-        
-        return json.loads(json.dumps(fig, cls=PlotlyJSONEncoder))
+        return _render_template(_COMPLIANCE_GAUGE_TEMPLATE, {"value": compliance_rate})
     
     def create_threat_level_chart(self, threat_distribution: Dict[str, int]) -> Dict[str, Any]:
         """Create threat level bar chart"""
         levels = list(threat_distribution.keys())
         counts = list(threat_distribution.values())
-        colors = ['green', 'yellow', 'orange', 'red']
         
-        fig = go.Figure(data=[go.Bar(
-            x=levels,
-            y=counts,
-            marker=dict(color=colors[:len(levels)])
-        )])
-        
-        fig.update_layout(
-            title="Security Events by Threat Level (24h)",
-            xaxis_title="Threat Level",
-            yaxis_title="Number of Events"
-        )
-        
-        return json.loads(json.dumps(fig, cls=PlotlyJSONEncoder))
+        return _render_template(_THREAT_LEVEL_TEMPLATE, {
+            "x": levels,
+            "y": counts,
+            "marker": {"color": THREAT_LEVEL_COLORS[:len(levels)]}
+        })
     
     def create_trust_score_histogram(self, db: Session) -> Dict[str, Any]:
         """Create trust score distribution histogram"""
         try:
-            devices = db.query(Device).filter(Device.trust_score > 0).all()
-            trust_scores = [d.trust_score for d in devices]
+            # Only the score column is needed, so skip hydrating Device objects
+            trust_scores = db.scalars(
+                select(Device.trust_score).where(Device.trust_score > 0)
+            ).all()
             
             if not trust_scores:
-                # Create empty chart
-                fig = go.Figure()
-                fig.update_layout(title="Trust Score Distribution", 
-                                xaxis_title="Trust Score", 
-                                yaxis_title="Number of Devices")
-                return json.loads(json.dumps(fig, cls=PlotlyJSONEncoder))
-            
-            fig = go.Figure(data=[go.Histogram(
-                x=trust_scores,
-                nbinsx=20,
-                marker=dict(color='skyblue', line=dict(color='black', width=1))
-            )])
-            
-            fig.update_layout(
-                title="Trust Score Distribution",
-                xaxis_title="Trust Score",
-                yaxis_title="Number of Devices",
-                bargap=0.1
-            )
+                return _empty_chart(_TRUST_SCORE_TEMPLATE)
             
-            return json.loads(json.dumps(fig, cls=PlotlyJSONEncoder))
+            return _render_template(_TRUST_SCORE_TEMPLATE, {"x": trust_scores})
             
         except Exception as e:
             logger.error(f"Error creating trust score histogram: {e}")
@@ -484,47 +587,46 @@ class DashboardGenerator:
     def create_timeline_chart(self, historical_metrics: List[Dict[str, Any]]) -> Dict[str, Any]:
         """Create timeline chart showing trends"""
         if not historical_metrics:
-            fig = go.Figure()
-            fig.update_layout(title="Security Metrics Timeline")
-            return json.loads(json.dumps(fig, cls=PlotlyJSONEncoder))
-        
-        timestamps = [datetime.fromisoformat(m['timestamp']) for m in historical_metrics]
-        compliance_rates = [m['compliance_rate'] for m in historical_metrics]
-        trust_scores = [m['average_trust_score'] * 100 for m in historical_metrics]  # Scale to percentage
-        
-        fig = go.Figure()
+            return _empty_chart(_TIMELINE_TEMPLATE)
         
-        fig.add_trace(go.Scatter(
-            x=timestamps,
-            y=compliance_rates,
-            mode='lines+markers',
-            name='Compliance Rate (%)',
-            line=dict(color='blue')
-        ))
+        # Columnar conversion parses every timestamp in one vectorized pass
+        df = pd.DataFrame(historical_metrics, columns=['timestamp', 'compliance_rate', 'average_trust_score'])
+        # Back to ISO strings so the chart stays JSON-native rather than holding pd.Timestamp
+        timestamps = [ts.isoformat() for ts in pd.to_datetime(df['timestamp'])]
+        trust_scores = (df['average_trust_score'] * 100).tolist()  # Scale to percentage
         
-        fig.add_trace(go.Scatter(
-            x=timestamps,
-            y=trust_scores,
-            mode='lines+markers',
-            name='Avg Trust Score (%)',
-            line=dict(color='green')
-        ))
-        
-        fig.update_layout(
-            title="Security Metrics Timeline",
-            xaxis_title="Time",
-            yaxis_title="Percentage",
-            legend=dict(x=0, y=1)
+        return _render_template(
+            _TIMELINE_TEMPLATE,
+            {"x": timestamps, "y": df['compliance_rate'].tolist()},
+            {"x": timestamps, "y": trust_scores}
         )
-        
-        return json.loads(json.dumps(fig, cls=PlotlyJSONEncoder))
 
 
 class VisibilityOrchestrator:
     """Main orchestrator for visibility and monitoring services"""
     
+    CHARTS_CACHE_KEY = "dashboard:charts"
+    CHARTS_CACHE_TTL = 30  # seconds; outlives two refresh intervals
+    # Cached under database.DASHBOARD_CACHE_KEY, which the monitoring and response
+    # services delete when device state changes
+    DASHBOARD_CACHE_TTL = 30  # seconds
+    HEALTH_CACHE_TTL = 10  # seconds; health rarely changes between dashboard renders
+    DASHBOARD_REFRESH_INTERVAL = 15.0  # seconds between background chart rebuilds
+    
+    # Device details polled by several UIs collapse into one load per device every
+    # few seconds; shared by every orchestrator in the process. Entries hold the
+    # serialized details and the device's details version when they were loaded
+    _device_details_cache = TTLCache(maxsize=4096, ttl=5)
+    _device_details_lock = threading.Lock()
+    
+    # Runs the Redis-only dashboard reads while the request thread queries the
+    # database; the session itself is never shared across threads
+    _fetch_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="dashboard-fetch")
+    
     def __init__(self, redis_host: str = "localhost", redis_port: int = 6379):
-        self.redis_client = redis.Redis(host=redis_host, port=redis_port, decode_responses=True)
+        self.redis_client = get_redis_client(redis_host, redis_port)
+        self._refresh_task: Optional[asyncio.Task] = None
+        self._health_cache = (0.0, None)  # (time.monotonic() of last check, health dict)
         
         # Initialize services
         self.logging_service = CentralizedLoggingService(self.redis_client)
@@ -538,9 +640,43 @@ class VisibilityOrchestrator:
         
         logger.info("Visibility Orchestrator initialized")
     
+    def start(self, refresh_interval: float = DASHBOARD_REFRESH_INTERVAL) -> None:
+        """Start the orchestrator's background work on the running event loop"""
+        self.start_dashboard_refresher(refresh_interval)
+        logger.info("Visibility Orchestrator started")
+    
+    def stop(self) -> None:
+        """Stop the orchestrator's background work"""
+        self.stop_dashboard_refresher()
+        logger.info("Visibility Orchestrator stopped")
+    
     def get_dashboard_data(self, db: Session) -> Dict[str, Any]:
         """Get comprehensive dashboard data"""
+        # Every up-front Redis lookup the request needs, in one round-trip
+        cached = cached_charts = None
+        health_stale = self._cached_health() is None
+        redis_healthy = False  # Stays False if Redis can't be reached at all
+        try:
+            pipe = self.redis_client.pipeline(transaction=False)
+            pipe.get(DASHBOARD_CACHE_KEY)
+            pipe.get(self.CHARTS_CACHE_KEY)
+            if health_stale:
+                # Only ping when the cached health check has gone stale
+                pipe.ping()
+            cached, cached_charts, *ping = pipe.execute()
+            redis_healthy = ping[0] if ping else None
+            if cached:
+                return orjson.loads(cached)
+        except redis.RedisError as e:
+            logger.warning(f"Dashboard cache unavailable: {e}")
+        
         try:
+            # One cutoff per request, bound as a parameter of the cached statement
+            recent_cutoff = datetime.utcnow() - timedelta(hours=24)
+            
+            # Get log statistics in the background; they only read Redis
+            log_stats_future = self._fetch_pool.submit(self.logging_service.get_log_statistics, 24)
+            
             # Initialize metrics collector with current DB session
             metrics_collector = MetricsCollector(self.redis_client, db)
             
@@ -550,26 +686,38 @@ class VisibilityOrchestrator:
             # Store metrics snapshot
             metrics_collector.store_metrics_snapshot(current_metrics)
             
-            # Get historical data for trends
-            historical_metrics = metrics_collector.get_historical_metrics(24)
-            
-            # Get log statistics
-            log_stats = self.logging_service.get_log_statistics(24)
-            
-            # Generate visualizations
-            device_status_chart = self.dashboard_generator.create_device_status_chart(current_metrics)
-            compliance_gauge = self.dashboard_generator.create_compliance_gauge(current_metrics.compliance_rate)
-            threat_level_chart = self.dashboard_generator.create_threat_level_chart(current_metrics.threat_level_distribution)
-            trust_score_histogram = self.dashboard_generator.create_trust_score_histogram(db)
-            timeline_chart = self.dashboard_generator.create_timeline_chart(historical_metrics)
-            
-            # Get recent security events
-            recent_events = db.query(SecurityEvent).filter(
-                SecurityEvent.created_at >= datetime.utcnow() - timedelta(hours=24)
-            ).order_by(SecurityEvent.created_at.desc()).limit(10).all()
+            # Historical data only feeds the charts; when they must be built inline,
+            # fetch it in the background once it includes the snapshot just stored
+            if not cached_charts:
+                historical_future = self._fetch_pool.submit(metrics_collector.get_historical_metrics, 24)
+            
+            # Get recent security events as dict-like rows, skipping ORM hydration
+            recent_events = db.execute(
+                select(
+                    SecurityEvent.id,
+                    SecurityEvent.event_id,
+                    SecurityEvent.event_type,
+                    SecurityEvent.threat_level,
+                    SecurityEvent.confidence_score,
+                    SecurityEvent.description,
+                    SecurityEvent.created_at,
+                    SecurityEvent.is_resolved
+                ).where(
+                    SecurityEvent.created_at >= recent_cutoff
+                ).order_by(SecurityEvent.created_at.desc()).limit(10)
+            ).mappings().all()
+            
+            log_stats = log_stats_future.result()
+            
+            # Use the charts pre-rendered by the background refresher, building them
+            # inline only on a cache miss
+            if cached_charts:
+                charts = orjson.loads(cached_charts)
+            else:
+                charts = self._build_charts(db, current_metrics, historical_future.result())
             
             # Get system health information
-            system_health = self._get_system_health()
+            system_health = self._get_system_health(redis_healthy)
             
             dashboard_data = {
                 "timestamp": current_metrics.timestamp,
@@ -584,38 +732,89 @@ class VisibilityOrchestrator:
                     "average_trust_score": round(current_metrics.average_trust_score, 3),
                     "compliance_rate": round(current_metrics.compliance_rate, 1)
                 },
-                "charts": {
-                    "device_status": device_status_chart,
-                    "compliance_gauge": compliance_gauge,
-                    "threat_levels": threat_level_chart,
-                    "trust_scores": trust_score_histogram,
-                    "timeline": timeline_chart
-                },
+                "charts": charts,
                 "recent_events": [
-                    {
-                        "id": event.id,
-                        "event_id": event.event_id,
-                        "event_type": event.event_type,
-                        "threat_level": event.threat_level,
-                        "confidence_score": event.confidence_score,
-                        "description": event.description,
-                        "created_at": event.created_at.isoformat(),
-                        "is_resolved": event.is_resolved
-                    }
+                    {**event, "created_at": event["created_at"].isoformat()}
                     for event in recent_events
                 ],
                 "log_statistics": log_stats,
                 "system_health": system_health
             }
             
+            try:
+                pipe = self.redis_client.pipeline(transaction=False)
+                pipe.set(DASHBOARD_CACHE_KEY, dumps_dashboard(dashboard_data), ex=self.DASHBOARD_CACHE_TTL)
+                if not cached_charts:
+                    # Publish inline-built charts too, so other viewers don't rebuild
+                    # them when the background refresher isn't running
+                    pipe.set(self.CHARTS_CACHE_KEY, dumps_dashboard(charts), ex=self.CHARTS_CACHE_TTL)
+                pipe.execute()
+            except (redis.RedisError, TypeError) as e:
+                logger.warning(f"Could not cache dashboard data: {e}")
+            
             return dashboard_data
             
         except Exception as e:
             logger.error(f"Error generating dashboard data: {e}")
             return {"error": str(e)}
     
-    def _get_system_health(self) -> Dict[str, Any]:
-        """Get system health status"""
+    def _build_charts(self, db: Session, current_metrics: DashboardMetrics,
+                      historical_metrics: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Generate all dashboard visualizations"""
+        return {
+            "device_status": self.dashboard_generator.create_device_status_chart(current_metrics),
+            "compliance_gauge": self.dashboard_generator.create_compliance_gauge(current_metrics.compliance_rate),
+            "threat_levels": self.dashboard_generator.create_threat_level_chart(current_metrics.threat_level_distribution),
+            "trust_scores": self.dashboard_generator.create_trust_score_histogram(db),
+            "timeline": self.dashboard_generator.create_timeline_chart(historical_metrics)
+        }
+    
+    def _refresh_dashboard_charts(self) -> None:
+        """Rebuild the summary metrics and charts and publish them to the shared cache"""
+        with db_manager.get_session() as db:
+            metrics_collector = MetricsCollector(self.redis_client, db)
+            # Keep the summary maintained off the request path, so dashboard
+            # requests read one precomputed key instead of aggregating the tables
+            current_metrics = metrics_collector.refresh_current_metrics(self.CHARTS_CACHE_TTL)
+            historical_metrics = metrics_collector.get_historical_metrics(24)
+            charts = self._build_charts(db, current_metrics, historical_metrics)
+        
+        self.redis_client.set(
+            self.CHARTS_CACHE_KEY,
+            dumps_dashboard(charts),
+            ex=self.CHARTS_CACHE_TTL
+        )
+    
+    async def _refresh_dashboard_cache(self, interval: float):
+        """Periodically precompute dashboard metrics and charts off the request path"""
+        loop = asyncio.get_running_loop()
+        while True:
+            try:
+                # Chart building is CPU-bound and the DB/Redis clients are blocking
+                await loop.run_in_executor(None, self._refresh_dashboard_charts)
+            except Exception as e:
+                logger.error(f"Error refreshing dashboard charts: {e}")
+            
+            await asyncio.sleep(interval)
+    
+    def start_dashboard_refresher(self, interval: float = DASHBOARD_REFRESH_INTERVAL) -> asyncio.Task:
+        """Start the background chart refresher on the running event loop"""
+        if self._refresh_task is None or self._refresh_task.done():
+            self._refresh_task = asyncio.create_task(self._refresh_dashboard_cache(interval))
+        return self._refresh_task
+    
+    def stop_dashboard_refresher(self) -> None:
+        """Cancel the background chart refresher"""
+        if self._refresh_task is not None:
+            self._refresh_task.cancel()
+            self._refresh_task = None
+    
+    def _get_system_health(self, redis_healthy: Optional[bool] = None) -> Dict[str, Any]:
+        """Get system health status, reusing a Redis ping result the caller already has"""
+        cached_health = self._cached_health()
+        if cached_health is not None:
+            return cached_health
+        
         try:
             health = {
                 "overall_status": "healthy",
@@ -631,46 +830,115 @@ class VisibilityOrchestrator:
             }
             
             # Check Redis connectivity
-            try:
-                self.redis_client.ping()
-                health["components"]["redis"] = "healthy"
-            except:
+            if redis_healthy is None:
+                try:
+                    redis_healthy = self.redis_client.ping()
+                except:
+                    redis_healthy = False
+            
+            if not redis_healthy:
                 health["components"]["redis"] = "unhealthy"
                 health["overall_status"] = "degraded"
             
             # Additional health checks would go here
             # For now, we'll simulate healthy status
             
+            self._health_cache = (time.monotonic(), health)
             return health
             
         except Exception as e:
             logger.error(f"Error checking system health: {e}")
             return {"overall_status": "unknown", "error": str(e)}
     
+    def _cached_health(self) -> Optional[Dict[str, Any]]:
+        """Return the last health check if it is recent enough to reuse"""
+        checked_at, health = self._health_cache
+        if health is not None and time.monotonic() - checked_at < self.HEALTH_CACHE_TTL:
+            return health
+        return None
+    
+    def get_online_status(self, device_ids: List[str]) -> Dict[str, bool]:
+        """Map device IDs to whether their heartbeat key is live, in one MGET"""
+        if not device_ids:
+            return {}
+        heartbeats = self.redis_client.mget([f"heartbeat:{device_id}" for device_id in device_ids])
+        return {device_id: heartbeat is not None for device_id, heartbeat in zip(device_ids, heartbeats)}
+    
     def get_device_details(self, db: Session, device_id: str) -> Dict[str, Any]:
-        """Get detailed information about a specific device"""
+        """Get detailed information about a specific device, memoized for a few seconds"""
+        # The monitoring and response services bump the version on posture and
+        # quarantine changes, in whichever process they run
+        version = self.redis_client.get(device_details_version_key(device_id))
+        with self._device_details_lock:
+            cached = self._device_details_cache.get(device_id)
+        if cached is not None and cached[0] == version:
+            # Decode a fresh copy so callers can't mutate the cached details
+            return orjson.loads(cached[1])
+        
+        device_details = self._load_device_details(db, device_id)
+        if "error" not in device_details:
+            with self._device_details_lock:
+                self._device_details_cache[device_id] = (version, dumps_dashboard(device_details))
+        return device_details
+    
+    def _load_device_details(self, db: Session, device_id: str) -> Dict[str, Any]:
+        """Load detailed information about a specific device"""
         try:
-            device = db.query(Device).filter(Device.device_id == device_id).first()
+            events_cutoff = datetime.utcnow() - timedelta(days=7)
+            
+            # Load the device with its posture joined in, hydrating just the
+            # attributes the response uses
+            device = db.query(Device).options(
+                load_only(
+                    Device.device_id, Device.device_name, Device.device_type,
+                    Device.mac_address, Device.ip_address, Device.os_version,
+                    Device.is_compliant, Device.is_quarantined, Device.trust_score,
+                    Device.last_seen
+                ),
+                joinedload(Device.posture_checks).load_only(
+                    DevicePosture.antivirus_enabled, DevicePosture.firewall_enabled,
+                    DevicePosture.os_updated, DevicePosture.encryption_enabled,
+                    DevicePosture.compliance_score, DevicePosture.last_check
+                )
+            ).filter(Device.device_id == device_id).first()
             if not device:
                 return {"error": "Device not found"}
             
-            # Get device posture
-            posture = db.query(DevicePosture).filter(DevicePosture.device_id == device.id).first()
-            
-            # Get recent security events
-            recent_events = db.query(SecurityEvent).filter(
-                SecurityEvent.device_id == device.id,
-                SecurityEvent.created_at >= datetime.utcnow() - timedelta(days=7)
-            ).order_by(SecurityEvent.created_at.desc()).all()
-            
-            # Get response actions
-            response_actions = db.query(ResponseActionModel).join(SecurityEvent).filter(
-                SecurityEvent.device_id == device.id
-            ).order_by(ResponseActionModel.created_at.desc()).limit(10).all()
-            
-            # Get heartbeat status
-            heartbeat_key = f"heartbeat:{device_id}"
-            online_status = self.redis_client.exists(heartbeat_key)
+            posture = device.posture_checks[0] if device.posture_checks else None
+            
+            # The last week's events and the latest response actions come back as
+            # rows already keyed like the response, newest first, so they need no
+            # ORM hydration or per-row dict building
+            recent_events = db.execute(
+                select(
+                    SecurityEvent.event_id,
+                    SecurityEvent.event_type,
+                    SecurityEvent.threat_level,
+                    SecurityEvent.confidence_score,
+                    SecurityEvent.description,
+                    SecurityEvent.created_at,
+                    SecurityEvent.is_resolved
+                ).where(
+                    SecurityEvent.device_id == device.id,
+                    SecurityEvent.created_at >= events_cutoff
+                ).order_by(SecurityEvent.created_at.desc())
+            ).mappings().all()
+            
+            # Response actions span every event, not just the last week
+            response_actions = db.execute(
+                select(
+                    ResponseActionModel.action_id,
+                    ResponseActionModel.action_type,
+                    ResponseActionModel.description,
+                    ResponseActionModel.status,
+                    ResponseActionModel.executed_at,
+                    ResponseActionModel.created_at
+                ).join(SecurityEvent).where(
+                    SecurityEvent.device_id == device.id
+                ).order_by(ResponseActionModel.created_at.desc()).limit(10)
+            ).mappings().all()
+            
+            online_status = self.get_online_status([device_id])[device_id]
             
             device_details = {
                 "device_info": {
@@ -684,7 +952,7 @@ class VisibilityOrchestrator:
                     "is_quarantined": device.is_quarantined,
                     "trust_score": device.trust_score,
                     "last_seen": device.last_seen.isoformat() if device.last_seen else None,
-                    "online": bool(online_status)
+                    "online": online_status
                 },
                 "posture": {
                     "antivirus_enabled": posture.antivirus_enabled if posture else False,
@@ -695,25 +963,15 @@ class VisibilityOrchestrator:
                     "last_check": posture.last_check.isoformat() if posture and posture.last_check else None
                 },
                 "recent_events": [
-                    {
-                        "event_id": event.event_id,
-                        "event_type": event.event_type,
-                        "threat_level": event.threat_level,
-                        "confidence_score": event.confidence_score,
-                        "description": event.description,
-                        "created_at": event.created_at.isoformat(),
-                        "is_resolved": event.is_resolved
-                    }
+                    {**event, "created_at": event["created_at"].isoformat()}
                     for event in recent_events
                 ],
                 "response_actions": [
                     {
-                        "action_id": action.action_id,
-                        "action_type": action.action_type,
-                        "description": action.description,
-                        "status": action.status,
-                        "executed_at": action.executed_at.isoformat() if action.executed_at else None,
-                        "created_at": action.created_at.isoformat()
+                        **action,
+                        "status": ResponseStatus.from_stored(action["status"]).name.lower(),
+                        "executed_at": action["executed_at"].isoformat() if action["executed_at"] else None,
+                        "created_at": action["created_at"].isoformat()
                     }
                     for action in response_actions
                 ]
@@ -734,18 +992,8 @@ class VisibilityOrchestrator:
             limit = query_params.get("limit", 100)
             search_term = query_params.get("search_term")
             
-            logs = self.logging_service.query_logs(log_type, severity, time_range, limit * 2)
-            
-            # Apply text search if specified
-            if search_term:
-                filtered_logs = []
-                for log in logs:
-                    log_text = json.dumps(log).lower()
-                    if search_term.lower() in log_text:
-                        filtered_logs.append(log)
-                logs = filtered_logs
-            
-            return logs[:limit]
+            # Text search is applied while reading the log streams
+            return self.logging_service.query_logs(log_type, severity, time_range, limit, search_term)
             
         except Exception as e:
             logger.error(f"Error searching logs: {e}")
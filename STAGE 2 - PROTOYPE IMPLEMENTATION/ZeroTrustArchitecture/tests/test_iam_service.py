@@ -0,0 +1,21 @@
+"""
+Tests for token handling in the IAM service
+"""
+
+from src.identity.iam_service import IAMService
+
+
+def test_verify_token_result_does_not_alias_cache():
+    iam_service = IAMService(secret_key="test-secret-key")
+    token = iam_service.create_access_token({"sub": "alice", "session_id": "session-1"})
+    
+    payload = iam_service.verify_token(token)
+    payload["sub"] = "mallory"
+    payload.pop("session_id")
+    
+    cached = iam_service.verify_token(token)
+    assert cached["sub"] == "alice"
+    assert cached["session_id"] == "session-1"
+    
+    cached["sub"] = "mallory"
+    assert iam_service.verify_token(token)["sub"] == "alice"
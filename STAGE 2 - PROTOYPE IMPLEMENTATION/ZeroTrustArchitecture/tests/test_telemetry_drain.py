@@ -0,0 +1,67 @@
+"""
+Tests for batched telemetry draining in the endpoint monitoring service
+"""
+
+from unittest.mock import MagicMock
+
+import pytest
+
+from src.database import DatabaseManager
+from src.endpoint_monitoring import monitoring_service
+from src.endpoint_monitoring.monitoring_service import EndpointMonitoringService
+from src.models import Device, DevicePosture
+
+
+@pytest.fixture
+def database(tmp_path, monkeypatch):
+    database = DatabaseManager(f"sqlite:///{tmp_path / 'telemetry.db'}")
+    database.create_tables()
+    monkeypatch.setattr(monitoring_service, "db_manager", database)
+    with database.get_session() as db:
+        for device_id in ("good-device", "bad-device"):
+            db.add(Device(device_id=device_id, device_name=device_id,
+                          device_type="laptop", mac_address=""))
+    return database
+
+
+def test_bad_record_does_not_discard_batch(database):
+    service = EndpointMonitoringService()
+    service.redis_client = MagicMock()
+    compliant = {"antivirus_running": True, "firewall_enabled": True,
+                 "os_up_to_date": True, "encryption_enabled": True}
+    
+    service._drain_telemetry({
+        "good-device": [{"compliance_status": compliant}],
+        # Non-boolean compliance values can't be scored
+        "bad-device": [{"compliance_status": {"antivirus_running": "yes"}}],
+        "new-device": [{"compliance_status": compliant}],
+    })
+    
+    with database.get_session() as db:
+        devices = {device.device_id: device for device in db.query(Device).all()}
+        assert devices["good-device"].last_seen is not None
+        assert devices["good-device"].is_compliant
+        assert devices["new-device"].is_compliant
+        assert devices["bad-device"].last_seen is None
+        
+        postures = {posture.device_id for posture in db.query(DevicePosture).all()}
+        assert postures == {devices["good-device"].id, devices["new-device"].id}
+    service.redis_client.pipeline.return_value.execute.assert_called_once()
+
+
+def test_failed_drain_is_requeued(database):
+    service = EndpointMonitoringService()
+    service.redis_client = MagicMock()
+    service.redis_client.pipeline.return_value.execute.side_effect = ConnectionError
+    buffer = {"good-device": [{"compliance_status": {}}]}
+    
+    with pytest.raises(ConnectionError):
+        service._drain_telemetry(buffer)
+    service.telemetry_buffer = {"good-device": [{"compliance_status": {"firewall_enabled": True}}]}
+    service._buffered_count = 1
+    service._requeue_telemetry(buffer)
+    
+    assert service.telemetry_buffer["good-device"][0] == {"compliance_status": {}}
+    assert service._buffered_count == 2
+    with database.get_session() as db:
+        assert db.query(Device).filter(Device.device_id == "good-device").one().last_seen is None